@@ -31,12 +31,7 @@ class AlphaHomoraAdapter(BaseAdapter):
         """
         apy_data = get_url_json(cls._apy_url, timeout=timeout)
         # Convert to list output
-        tlist = list()
-        for k, v in apy_data.items():
-            el = v
-            el["pool"] = k
-            tlist.append(el)
-        apy_data = tlist
+        apy_data = [{**v, "pool": k} for k, v in apy_data.items()]
         return apy_data
 
     @classmethod
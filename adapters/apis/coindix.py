@@ -2,15 +2,26 @@
 API to interface with CoinDix public API
 """
 from adapters.apis.base import BaseAdapter
-from adapters.apis.util import get_url_json
-import json
+from adapters.apis.util import (
+    RateLimiter,
+    aget_url_content,
+    aget_url_json,
+    cached_get_url_json,
+    get_url_content,
+    get_url_json,
+    json_dumps,
+)
+import aiohttp
+import asyncio
+import itertools
 import logging
 from pathlib import Path
 import requests
 import time
 from tqdm import tqdm
+from types import MappingProxyType
 import typer
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 app = typer.Typer()
 
@@ -21,45 +32,53 @@ class CoinDixAdapter(BaseAdapter):
     _search_url = "https://api.coindix.com/search"
     _auth_url = "https://api.coindix.com/users/login"
     _vault_url = "https://api.coindix.com/vaults"
-    _search_headers = {
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Connection": "keep-alive",
-        "If-None-Match": 'W/"18ef-F3ewVVK3weV89utiLtPtZPpgPLc"',
-        "Origin": "https://coindix.com",
-        "Referer": "https://coindix.com/",
-        "Sec-Fetch-Dest": "empty",
-        "Sec-Fetch-Mode": "cors",
-        "Sec-Fetch-Site": "same-site",
-        "Sec-GPC": "1",
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.41 Safari/537.36",  # NOQA
-    }
-    _auth_headers = {
-        "Accept": "*/*",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Connection": "keep-alive",
-        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-        "Origin": "https://coindix.com",
-        "Referer": "https://coindix.com/",
-        "Sec-Fetch-Dest": "empty",
-        "Sec-Fetch-Mode": "cors",
-        "Sec-Fetch-Site": "same-site",
-        "Sec-GPC": "1",
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.41 Safari/537.36",  # NOQA
-    }
-    _state_headers = {
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Authorization": None,
-        "Connection": "keep-alive",
-        "Origin": "https://coindix.com",
-        "Referer": "https://coindix.com/",
-        "Sec-Fetch-Dest": "empty",
-        "Sec-Fetch-Mode": "cors",
-        "Sec-Fetch-Site": "same-site",
-        "Sec-GPC": "1",
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.41 Safari/537.36",  # NOQA
-    }
+    # Maximum number of in-flight search requests
+    _max_concurrency = 20
+    # Request headers are read-only so they can be shared without copying
+    _search_headers = MappingProxyType(
+        {
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Connection": "keep-alive",
+            "Origin": "https://coindix.com",
+            "Referer": "https://coindix.com/",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "same-site",
+            "Sec-GPC": "1",
+            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.41 Safari/537.36",  # NOQA
+        }
+    )
+    _auth_headers = MappingProxyType(
+        {
+            "Accept": "*/*",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Connection": "keep-alive",
+            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+            "Origin": "https://coindix.com",
+            "Referer": "https://coindix.com/",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "same-site",
+            "Sec-GPC": "1",
+            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.41 Safari/537.36",  # NOQA
+        }
+    )
+    _state_headers = MappingProxyType(
+        {
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Authorization": None,
+            "Connection": "keep-alive",
+            "Origin": "https://coindix.com",
+            "Referer": "https://coindix.com/",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "same-site",
+            "Sec-GPC": "1",
+            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.41 Safari/537.36",  # NOQA
+        }
+    )
 
     @classmethod
     def authenticate(cls, email: str, password: str) -> Dict[str, str]:
@@ -77,20 +96,38 @@ class CoinDixAdapter(BaseAdapter):
 
     @classmethod
     def get_chains(cls, timeout: Optional[float] = None) -> Dict[str, List[str]]:
-        data = get_url_json(cls._init_url, headers=cls._search_headers, timeout=timeout)
-        chains = data["chains"]
-        for k, v in chains.items():
-            chains[k] = [vv["hash"] for vv in v]
+        data = cached_get_url_json(
+            cls._init_url, headers=cls._search_headers, timeout=timeout
+        )
+        # Build a new dict since the cached payload is shared
+        chains = {k: [vv["hash"] for vv in v] for k, v in data["chains"].items()}
         return chains
 
     @classmethod
     def get_vault_history(
-        cls, vault: int, token: str, timeout: Optional[float] = None
-    ) -> List[Dict[str, Any]]:
-        headers = cls._state_headers.copy()
-        headers["Authorization"] = f"Bearer {token}"
+        cls,
+        vault: int,
+        token: str,
+        timeout: Optional[float] = None,
+        raw: bool = False,
+    ) -> Union[Dict[str, Any], bytes]:
+        """
+        Fetches the history of a single vault.
+
+        Args:
+            vault: ID of vault to fetch
+            token: Bearer token from `authenticate`
+            timeout: time in seconds to wait before timeout occurs
+            raw: If True, return the undecoded JSON response body
+
+        Returns:
+            data: Vault history, decoded unless `raw` is set
+        """
+        headers = {**cls._state_headers, "Authorization": f"Bearer {token}"}
         params = {"period": 365}
         url = f"{cls._vault_url}/{vault}"
+        if raw:
+            return get_url_content(url, params=params, headers=headers, timeout=timeout)
         data = get_url_json(url, params=params, headers=headers, timeout=timeout)
         return data
 
@@ -101,7 +138,25 @@ class CoinDixAdapter(BaseAdapter):
         password: str,
         timeout: Optional[float] = None,
         sleep_dur: float = 0.1,
-    ) -> List[Dict[str, Any]]:
+        max_connections: int = 16,
+        raw: bool = False,
+    ) -> List[Union[Dict[str, Any], bytes]]:
+        """
+        Fetches the history of every vault. Requests are issued concurrently
+        over a bounded pool of keep-alive connections, but are started at most
+        once every `sleep_dur` seconds overall to stay polite to the server.
+
+        Args:
+            email: CoinDix account email
+            password: CoinDix account password
+            timeout: time in seconds to wait before timeout occurs
+            sleep_dur: Minimum time in seconds between consecutive requests
+            max_connections: Maximum number of concurrent connections
+            raw: If True, return each history as undecoded JSON bytes
+
+        Returns:
+            vault_histories: History for each vault
+        """
         resp_auth = cls.authenticate(email, password)
         token = resp_auth["token"]
 
@@ -111,39 +166,89 @@ class CoinDixAdapter(BaseAdapter):
         logging.info(f"Retrieved a total of {len(states)} vault states.")
         vault_ids = [s["id"] for s in states]
 
-        # Given vault IDs, fetch all histories (can take a while, like ~1hr or more)
-        vault_histories = list()
+        # Given vault IDs, fetch all histories
         logging.info(f"Fetching history for {len(vault_ids)} vaults ...")
-        for vault_id in tqdm(vault_ids):
-            data = cls.get_vault_history(vault_id, token, timeout=timeout)
-            vault_histories.append(data)
-            time.sleep(sleep_dur)
+        return asyncio.run(
+            cls._aget_vault_histories(
+                vault_ids, token, timeout, sleep_dur, max_connections, raw
+            )
+        )
+
+    @classmethod
+    async def _aget_vault_histories(
+        cls,
+        vault_ids: Sequence[int],
+        token: str,
+        timeout: Optional[float],
+        sleep_dur: float,
+        max_connections: int,
+        raw: bool,
+    ) -> List[Union[Dict[str, Any], bytes]]:
+        # Build the authenticated headers once for every request
+        headers = {**cls._state_headers, "Authorization": f"Bearer {token}"}
+        params = {"period": 365}
+        fetch = aget_url_content if raw else aget_url_json
+        rate_limiter = RateLimiter(sleep_dur)
+        connector = aiohttp.TCPConnector(limit=max_connections)
 
-        return vault_histories
+        async with aiohttp.ClientSession(connector=connector) as session:
+            with tqdm(total=len(vault_ids)) as progress:
+
+                async def _fetch(vault_id):
+                    await rate_limiter.async_wait()
+                    data = await fetch(
+                        session,
+                        f"{cls._vault_url}/{vault_id}",
+                        headers=headers,
+                        params=params,
+                        timeout=timeout,
+                    )
+                    progress.update()
+                    return data
+
+                return await asyncio.gather(*[_fetch(vid) for vid in vault_ids])
 
     @classmethod
     def get_all_states(
         cls, timeout: Optional[float] = None, sleep_dur: float = 0.1
     ) -> List[Dict[str, Any]]:
+        """
+        Retrieve current state for all pools across every chain and protocol.
+        Each (chain, protocol) query is fetched concurrently.
+
+        Args:
+            timeout: time in seconds to wait before timeout occurs
+            sleep_dur: Unused, kept for backwards compatibility
+
+        Returns:
+            states: Current vault states across all chains
+        """
         # Get all chains so that we don't hit the max return in paginated results
         chains = cls.get_chains(timeout=timeout)
         logging.info(f"Found {len(chains)} to query.")
+        return asyncio.run(cls._aget_all_states(chains, timeout=timeout))
 
-        states = list()
-        for chain in tqdm(chains.keys()):
-            logging.info(f"Fetching current vault states for chain: {chain} ...")
-            protocols = chains[chain]
-            for protocol in protocols:
-                cur_states = CoinDixAdapter.get_current_states(
-                    chains=[chain], protocols=[protocol]
-                )
-                if len(cur_states) > 0:
-                    states += cur_states
-                logging.info(
-                    f"Retrieved {len(cur_states)} vault states for chain={chain}, "
-                    f"protocol={protocol}"
-                )
-        return states
+    @classmethod
+    async def _aget_all_states(
+        cls, chains: Dict[str, List[str]], timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        pairs = [(c, p) for c, ps in chains.items() for p in ps]
+        logging.info(f"Fetching current vault states for {len(pairs)} protocols ...")
+        semaphore = asyncio.Semaphore(cls._max_concurrency)
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(
+                *[
+                    cls._aget_current_states(
+                        session,
+                        semaphore,
+                        chains=[chain],
+                        protocols=[protocol],
+                        timeout=timeout,
+                    )
+                    for chain, protocol in pairs
+                ]
+            )
+        return list(itertools.chain.from_iterable(results))
 
     @classmethod
     def get_current_states(
@@ -157,11 +262,55 @@ class CoinDixAdapter(BaseAdapter):
         Retrieve current state for all pools derived from Coindix search URL
 
         Args:
+            chains: Optional chains to filter the search by
+            protocols: Optional protocols to filter the search by
             timeout: time in seconds to wait before timeout occurs
+            sleep_dur: Unused, kept for backwards compatibility
 
         Returns:
             apy_data: APY (total, trading, farming) data broken out by pool
         """
+
+        async def _run():
+            semaphore = asyncio.Semaphore(cls._max_concurrency)
+            async with aiohttp.ClientSession() as session:
+                return await cls._aget_current_states(
+                    session, semaphore, chains, protocols, timeout
+                )
+
+        return asyncio.run(_run())
+
+    @classmethod
+    async def _aget_search_page(
+        cls,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Fetches a single page of search results, bounded by semaphore"""
+        async with semaphore:
+            return await aget_url_json(
+                session,
+                cls._search_url,
+                headers=cls._search_headers,
+                params=params,
+                timeout=timeout,
+            )
+
+    @classmethod
+    async def _aget_current_states(
+        cls,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        chains: Optional[Sequence[str]] = None,
+        protocols: Optional[Sequence[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async implementation of get_current_states. Fetches the first page to
+        learn the page count, then fetches the remaining pages concurrently.
+        """
         params = {"sort": "-tvl", "page": 1}
         if chains:
             chains_str = "-".join(chains)
@@ -169,27 +318,36 @@ class CoinDixAdapter(BaseAdapter):
         if protocols:
             protocols_str = "-".join(protocols)
             params["protocol"] = protocols_str
-        has_next_page = True
-        states = list()
-        cnt = 1
-        while has_next_page:
-            resp = get_url_json(
-                cls._search_url,
-                headers=cls._search_headers,
-                params=params,
-                timeout=timeout,
-            )
-            data = resp.get("data")
-            if data is not None and len(data) > 0:
-                states += data
-                if cnt == 1:
-                    total_pages = resp.get("totalPages")
-                    total_vaults = resp.get("total")
-                    logging.info(f"Fetching {total_vaults} across {total_pages} pages.")
-            cnt += 1
-            time.sleep(sleep_dur)
-            params["page"] = cnt
-            has_next_page = resp["hasNextPage"]
+
+        resp = await cls._aget_search_page(session, semaphore, params, timeout)
+        first_data = resp.get("data")
+        if not first_data:
+            return list()
+        total_pages = resp.get("totalPages") or 1
+        total_vaults = resp.get("total")
+        logging.info(
+            f"Fetching {total_vaults} across {total_pages} pages for "
+            f"chain={params.get('chain')}, protocol={params.get('protocol')}."
+        )
+
+        # Remaining pages are independent once the page count is known
+        pages = await asyncio.gather(
+            *[
+                cls._aget_search_page(
+                    session, semaphore, {**params, "page": i}, timeout
+                )
+                for i in range(2, total_pages + 1)
+            ]
+        )
+
+        # Size the output once and copy each page into its final slot
+        page_data = [first_data] + [page.get("data") or [] for page in pages]
+        states = [None] * sum(len(data) for data in page_data)
+        offset = 0
+        for data in page_data:
+            end = offset + len(data)
+            states[offset:end] = data
+            offset = end
         return states
 
 
@@ -198,13 +356,31 @@ def download_all_vault_histories(
     email: str,
     password: str,
     output_file: Path = f"coindix_vault_histories_{int(time.time())}.json",
+    ndjson: bool = typer.Option(False),
 ):
+    """
+    Downloads the history of every vault and saves it to a file.
+
+    Args:
+        email: CoinDix account email
+        password: CoinDix account password
+        output_file: Where to save the results to
+        ndjson: If set, write one vault history per line (NDJSON) instead of
+            a single JSON array
+    """
     logging.info("Fetching all vault histories ...")
-    data = CoinDixAdapter.get_all_vault_histories(email, password)
+    # Keep responses as raw bytes when only writing them back out as a JSON array.
+    # NDJSON needs each record re-encoded onto a single line.
+    data = CoinDixAdapter.get_all_vault_histories(email, password, raw=not ndjson)
     logging.info(f"Retrieved {len(data)} vault histories.")
     logging.info(f"Saving results to: {output_file}.")
-    with open(output_file, "w") as f:
-        json.dump(data, f)
+    with open(output_file, "wb") as f:
+        if ndjson:
+            for record in data:
+                f.write(json_dumps(record))
+                f.write(b"\n")
+        else:
+            f.write(b"[" + b",".join(data) + b"]")
     logging.info("Done!")
 
 
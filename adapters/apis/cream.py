@@ -2,10 +2,17 @@
 API to interface with CREAM Finance public API
 """
 from adapters.apis.base import BaseAdapter
-from adapters.apis.util import calculate_apy_from_rate, get_url_json
+from adapters.apis.util import (
+    apy_rate_factor,
+    calculate_apy_from_rate_factor,
+    calculate_utilization_rate,
+    get_url_json,
+)
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from joblib import Parallel, delayed
+import numpy as np
 from pprint import pprint
+from tqdm import tqdm
 from typing import Any, Dict, List, Optional, Sequence
 
 
@@ -26,6 +33,13 @@ class CreamAdapter(BaseAdapter):
     # Default mantissa for borrow and supply rate per block. Seems to be consistent
     # for all tokens
     _mantissa = 10**18
+    # Number of worker threads used when n_jobs is not a positive count
+    _default_max_workers = 32
+
+    @classmethod
+    def _max_workers(cls, n_jobs: int) -> int:
+        """Maps a joblib-style n_jobs value to a thread pool size"""
+        return n_jobs if n_jobs > 0 else cls._default_max_workers
 
     @classmethod
     def get(cls, *args, **kwargs) -> List[List[Dict[str, Any]]]:
@@ -53,17 +67,14 @@ class CreamAdapter(BaseAdapter):
 
         # Enrich with a timestamp, UTC ISO-8601 and others
         timestamp = datetime.utcnow().isoformat()
-        for t in token_states:
+        utilization_rates = calculate_utilization_rate(
+            [float(t["total_borrows"]["value"]) for t in token_states],
+            [float(t["cash"]["value"]) for t in token_states],
+        )
+        for t, u in zip(token_states, utilization_rates.tolist()):
             t["timestamp"] = timestamp
             t["comptroller"] = comptroller
-            total_supply = float(t["total_borrows"]["value"]) + float(
-                t["cash"]["value"]
-            )
-            t["utilization_rate"] = None
-            if total_supply > 0:
-                t["utilization_rate"] = (
-                    float(t["total_borrows"]["value"]) / total_supply * 100
-                )
+            t["utilization_rate"] = None if u != u else u  # NaN when no supply
 
         return token_states
 
@@ -82,28 +93,34 @@ class CreamAdapter(BaseAdapter):
         Args:
             comptrollers: List of comptrollers to iterate over. If None,
                 uses all defaults
-            n_jobs: Number of jobs for joblib
+            n_jobs: Number of worker threads. Non-positive values use the
+                default pool size
             timeout: Timeout in seconds for request.get
-            verbose: Verbosity level for joblib
+            verbose: Shows a progress bar if non-zero
 
         Returns:
             all_token_states: List of token states
         """
         # Initialize
-        parallel_pool = Parallel(n_jobs=n_jobs, backend="threading", verbose=verbose)
         if isinstance(comptrollers, str):
             comptrollers = [comptrollers]  # force to list
         if not comptrollers:
             comptrollers = cls._comptrollers  # use defaults
 
-        # Set up functions to parallelize
-        delayed_funcs = list()
-        for c in comptrollers:
-            d_fn = delayed(cls.get_current_token_states_by_comptroller)(c, timeout)
-            delayed_funcs.append(d_fn)
-
         # Parallel fetch all
-        all_token_states = parallel_pool(delayed_funcs)
+        with ThreadPoolExecutor(max_workers=cls._max_workers(n_jobs)) as ex:
+            all_token_states = list(
+                tqdm(
+                    ex.map(
+                        lambda c: cls.get_current_token_states_by_comptroller(
+                            c, timeout
+                        ),
+                        comptrollers,
+                    ),
+                    total=len(comptrollers),
+                    disable=not verbose,
+                )
+            )
 
         # Flatten
         all_token_states = [item for sublist in all_token_states for item in sublist]
@@ -132,12 +149,13 @@ class CreamAdapter(BaseAdapter):
         )
 
         # Enrich each record with some derived fields
-        for t in token_history:
+        utilization_rates = calculate_utilization_rate(
+            [float(t["totalBorrows"]) for t in token_history],
+            [float(t["cash"]) for t in token_history],
+        )
+        for t, u in zip(token_history, utilization_rates.tolist()):
             t["comptroller"] = comptroller
-            total_supply = float(t["totalBorrows"]) + float(t["cash"])
-            t["utilization_rate"] = None
-            if total_supply > 0:
-                t["utilization_rate"] = float(t["totalBorrows"]) / total_supply * 100
+            t["utilization_rate"] = None if u != u else u  # NaN when no supply
 
         return token_history
 
@@ -156,15 +174,15 @@ class CreamAdapter(BaseAdapter):
         Args:
             comptrollers: List of comptrollers to iterate over.
                 If None, uses all defaults
-            n_jobs: Number of jobs for joblib
+            n_jobs: Number of worker threads. Non-positive values use the
+                default pool size
             timeout: Timeout in seconds for request.get
-            verbose: Verbosity level for joblib
+            verbose: Shows a progress bar if non-zero
 
         Returns:
             token_histories: List of token histories
         """
         # Initialize
-        parallel_pool = Parallel(n_jobs=n_jobs, backend="threading", verbose=verbose)
         if isinstance(comptrollers, str):
             comptrollers = [comptrollers]  # force to list
         if not comptrollers:
@@ -175,43 +193,53 @@ class CreamAdapter(BaseAdapter):
             comptrollers, n_jobs=n_jobs, timeout=timeout, verbose=verbose
         )
 
-        # Set up functions to parallelize to fetch history for all tokens
-        delayed_funcs = list()
-        for token in all_token_states:
-            d_fn = delayed(cls.get_token_history)(
-                token["token_address"], token["comptroller"], timeout
+        # Parallel fetch history for all tokens
+        with ThreadPoolExecutor(max_workers=cls._max_workers(n_jobs)) as ex:
+            token_histories = list(
+                tqdm(
+                    ex.map(
+                        lambda t: cls.get_token_history(
+                            t["token_address"], t["comptroller"], timeout
+                        ),
+                        all_token_states,
+                    ),
+                    total=len(all_token_states),
+                    disable=not verbose,
+                )
             )
-            delayed_funcs.append(d_fn)
-
-        # Parallel fetch all
-        token_histories = parallel_pool(delayed_funcs)
 
         # Enrich with supporting fields, aligning with token_states
-        # to use fields from there for enrichment
-        empty_inds = list()
-        for i, (ts, th) in enumerate(zip(all_token_states, token_histories)):
+        # to use fields from there for enrichment. Empty histories are dropped
+        enriched_histories = list()
+        for ts, th in zip(all_token_states, token_histories):
             if len(th) == 0:
-                empty_inds.append(i)
                 continue
-            for el in th:
-                comp = ts["comptroller"]
-                el["comptroller"] = comp
-                el["underlying_symbol"] = ts["underlying_symbol"]
-                borrow_rate_block = int(el["borrowRatePerBlock"])
-                supply_rate_block = int(el["supplyRatePerBlock"])
-                el["borrow_apy"] = calculate_apy_from_rate(
-                    borrow_rate_block, comp, cls._mantissa
-                )
-                el["supply_apy"] = calculate_apy_from_rate(
-                    supply_rate_block, comp, cls._mantissa
-                )
-
-        # Remove empties
-        token_histories = [
-            el for i, el in enumerate(token_histories) if i not in empty_inds
-        ]
-
-        return token_histories
+            # Convert rates for the whole history in one vectorized pass.
+            # comptroller is already set on each record by get_token_history
+            comp = ts["comptroller"]
+            underlying_symbol = ts["underlying_symbol"]
+            borrow_rates = np.fromiter(
+                (int(el["borrowRatePerBlock"]) for el in th),
+                dtype=np.float64,
+                count=len(th),
+            )
+            supply_rates = np.fromiter(
+                (int(el["supplyRatePerBlock"]) for el in th),
+                dtype=np.float64,
+                count=len(th),
+            )
+            k = apy_rate_factor(comp, cls._mantissa)
+            borrow_apys = calculate_apy_from_rate_factor(borrow_rates, k)
+            supply_apys = calculate_apy_from_rate_factor(supply_rates, k)
+            for el, borrow_apy, supply_apy in zip(
+                th, borrow_apys.tolist(), supply_apys.tolist()
+            ):
+                el["underlying_symbol"] = underlying_symbol
+                el["borrow_apy"] = borrow_apy
+                el["supply_apy"] = supply_apy
+            enriched_histories.append(th)
+
+        return enriched_histories
 
 
 if __name__ == "__main__":
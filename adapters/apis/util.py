@@ -1,10 +1,28 @@
 """
 Support functions for interfacing with APIs
 """
+import aiohttp
+import asyncio
 import backoff
+from cachetools import LRUCache, TTLCache
+import json
 import numpy as np
+from numpy.typing import ArrayLike
+import os
+import re
 import requests
-from typing import Union
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from typing import Any, Union
+from urllib3.util.request import ACCEPT_ENCODING
+
+try:
+    # orjson works on bytes directly and is several times faster than stdlib json
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # constants manually extracted from CREAM Finance JS webpack
 BLOCKS_PER_YEAR = {
@@ -17,14 +35,150 @@ BLOCKS_PER_YEAR = {
     "avalanche": 31536e3,
 }
 BACKOFF_MAX_TRIES = 8  # With exponential, 7 retries = 30 sec, 8 retries ~1.5 min
+# Default mantissa of per-block rates, with the APY rate factor precomputed for it
+APY_MANTISSA = 10**18
+_APY_K = {p: bpy / (365.0 * APY_MANTISSA) for p, bpy in BLOCKS_PER_YEAR.items()}
+CACHE_TTL = float(os.environ.get("ADAPTER_CACHE_TTL", 300))  # seconds
+
+# orjson silently parses integers wider than 64 bits (e.g. wei amounts) into
+# lossy floats. Any run of 19+ digits may be one, so those payloads are parsed
+# by the stdlib json parser instead, which keeps them exact
+_LONG_DIGITS = re.compile(r"\d{19,}")
+_LONG_DIGITS_BYTES = re.compile(rb"\d{19,}")
+
+
+def json_loads(s: Union[str, bytes]) -> Any:
+    """
+    Parses JSON with orjson when available, falling back to json.loads for
+    payloads that may hold integers beyond 64 bits, so they stay exact.
+
+    Args:
+        s: JSON text
+
+    Returns:
+        data: Parsed JSON payload
+    """
+    if orjson is None:
+        return json.loads(s)
+    pattern = _LONG_DIGITS_BYTES if isinstance(s, (bytes, bytearray)) else _LONG_DIGITS
+    if pattern.search(s):
+        return json.loads(s)
+    return orjson.loads(s)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serializes to compact JSON bytes with orjson when available, falling back
+    to json.dumps for values orjson rejects, e.g. integers beyond 64 bits.
+
+    Args:
+        obj: JSON-serializable object
+
+    Returns:
+        b: UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+# Shared session so repeated calls to the same hosts reuse keep-alive connections.
+# requests.Session is safe to share across the adapter thread pool workers.
+# Retries are left to backoff rather than urllib3.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0)
+)
+# ACCEPT_ENCODING advertises brotli only when a brotli decoder is installed
+_SESSION.headers.update(
+    {"Connection": "keep-alive", "Accept-Encoding": ACCEPT_ENCODING}
+)
+
+# Response cache for slowly-changing endpoints, see cached_get_url_json
+_CACHE = TTLCache(maxsize=256, ttl=CACHE_TTL)
+_CACHE_LOCK = threading.Lock()
+_KEY_LOCKS = dict()
+# Last seen (ETag, payload) per cache key, kept past the TTL for revalidation
+_ETAG_STORE = LRUCache(maxsize=256)
+
+
+class RateLimiter:
+    """
+    Thread-safe rate limiter that spaces out calls by a minimum interval,
+    regardless of how many threads are issuing them.
+    """
+
+    def __init__(self, min_interval: float) -> None:
+        """
+        Args:
+            min_interval: Minimum time in seconds between consecutive calls
+        """
+        self._min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def _reserve(self) -> float:
+        """Reserves the next slot and returns how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next_slot - now)
+            self._next_slot = max(now, self._next_slot) + self._min_interval
+        return delay
+
+    def wait(self) -> None:
+        """Blocks until the caller is allowed to proceed"""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_wait(self) -> None:
+        """Waits without blocking the event loop until the caller may proceed"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 
 @backoff.on_exception(
     backoff.expo, requests.exceptions.RequestException, max_tries=BACKOFF_MAX_TRIES
 )
+def _get_url_response(url, headers=None, params=None, timeout=None):
+    """
+    Issues a GET using the shared keep-alive session, wrapped in an
+    exponential backoff strategy. Raises on HTTP error statuses.
+    """
+    resp = _SESSION.get(url, headers=headers, params=params, timeout=timeout)
+    resp.raise_for_status()
+    return resp
+
+
+def get_url_content(url, headers=None, params=None, timeout=None) -> bytes:
+    """
+    URL raw content getter using the shared keep-alive session, wrapped in an
+    exponential backoff strategy
+
+    Args:
+        url: URL to run requests.get on
+        headers: headers to pass to get
+        params: params to pass to get
+        timeout: Time to wait in seconds until timeout
+
+    Returns:
+        resp.content: Undecoded response body
+
+    Raises:
+        RequestException: Any request exception, after backoff complete
+    """
+    return _get_url_response(
+        url, headers=headers, params=params, timeout=timeout
+    ).content
+
+
 def get_url_json(url, headers=None, params=None, timeout=None):
     """
-    URL JSON getter, wrapped in an exponential backoff strategy
+    URL JSON getter. See get_url_content for request and retry behavior.
 
     Args:
         url: URL to run requests.get on
@@ -38,29 +192,221 @@ def get_url_json(url, headers=None, params=None, timeout=None):
     Raises:
         RequestException: Any request exception, after backoff complete
     """
-    resp = requests.get(url, headers=headers, params=params, timeout=timeout)
-    resp.raise_for_status()
-    return resp.json()
+    return json_loads(
+        get_url_content(url, headers=headers, params=params, timeout=timeout)
+    )
 
 
-def calculate_apy_from_rate(rate: int, blocks_per_year: Union[int, str], mantissa: int):
+def cached_get_url_json(url, headers=None, params=None, timeout=None):
     """
-    Given borrow or supply rate and blocks per year, calculate equivalent APY.
-    Ref: https://docs.strike.org/getting-started/protocol-math/calculating-the-apy-using-rate-per-block
+    Cached version of get_url_json. Responses are reused for CACHE_TTL seconds,
+    configurable via the ADAPTER_CACHE_TTL environment variable. Concurrent
+    requests for the same key are coalesced into a single fetch. Once expired,
+    responses that carried an ETag are revalidated with If-None-Match, and a
+    304 Not Modified reuses the previous payload without downloading or
+    parsing it again. Only use it for slowly-changing metadata, not for
+    endpoints that are polled as a time series (e.g. by database_logger.py),
+    which would otherwise log the same payload under several timestamps.
+
+    The payload is shared between callers, so it must be treated as read-only.
+
+    Args:
+        url: URL to run requests.get on
+        headers: headers to pass to get
+        params: params to pass to get
+        timeout: Time to wait in seconds until timeout
+
+    Returns:
+        resp.json: JSON payload
+    """
+    key = (
+        url,
+        frozenset((params or {}).items()),
+        frozenset((headers or {}).items()),
+    )
+    with _CACHE_LOCK:
+        if key in _CACHE:
+            return _CACHE[key]
+        key_lock = _KEY_LOCKS.setdefault(key, threading.Lock())
+
+    with key_lock:
+        # Another thread may have filled the cache while we were waiting
+        with _CACHE_LOCK:
+            if key in _CACHE:
+                return _CACHE[key]
+        with _CACHE_LOCK:
+            etag_entry = _ETAG_STORE.get(key)
+        req_headers = dict(headers or {})
+        if etag_entry:
+            req_headers["If-None-Match"] = etag_entry[0]
+        resp = _get_url_response(
+            url, headers=req_headers, params=params, timeout=timeout
+        )
+        if resp.status_code == 304 and etag_entry:
+            data = etag_entry[1]
+        else:
+            data = json_loads(resp.content)
+        etag = resp.headers.get("ETag")
+        with _CACHE_LOCK:
+            _CACHE[key] = data
+            if etag:
+                _ETAG_STORE[key] = (etag, data)
+            _KEY_LOCKS.pop(key, None)
+    return data
+
+
+# A ClientTimeout expiry raises asyncio.TimeoutError, which is not a ClientError
+@backoff.on_exception(
+    backoff.expo,
+    (aiohttp.ClientError, asyncio.TimeoutError),
+    max_tries=BACKOFF_MAX_TRIES,
+)
+async def aget_url_content(
+    session: aiohttp.ClientSession, url, headers=None, params=None, timeout=None
+) -> bytes:
+    """
+    Async URL raw content getter, wrapped in an exponential backoff strategy
+
+    Args:
+        session: aiohttp session to issue the request on
+        url: URL to run session.get on
+        headers: headers to pass to get
+        params: params to pass to get
+        timeout: Time to wait in seconds until timeout
+
+    Returns:
+        resp.content: Undecoded response body
+
+    Raises:
+        ClientError: Any aiohttp client exception, after backoff complete
+        TimeoutError: asyncio.TimeoutError if the request times out, after
+            backoff complete
+    """
+    async with session.get(
+        url,
+        headers=headers,
+        params=params,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    ) as resp:
+        resp.raise_for_status()
+        return await resp.read()
+
+
+async def aget_url_json(
+    session: aiohttp.ClientSession, url, headers=None, params=None, timeout=None
+):
+    """
+    Async URL JSON getter. See aget_url_content for request and retry behavior.
+
+    Args:
+        session: aiohttp session to issue the request on
+        url: URL to run session.get on
+        headers: headers to pass to get
+        params: params to pass to get
+        timeout: Time to wait in seconds until timeout
+
+    Returns:
+        resp.json: JSON payload
+
+    Raises:
+        ClientError: Any aiohttp client exception, after backoff complete
+        TimeoutError: asyncio.TimeoutError if the request times out, after
+            backoff complete
+    """
+    content = await aget_url_content(
+        session, url, headers=headers, params=params, timeout=timeout
+    )
+    return json_loads(content)
+
+
+def apy_rate_factor(blocks_per_year: Union[int, str], mantissa: int) -> float:
+    """
+    Per-block rate scaling used in the APY calculation,
+    i.e. blocks_per_year / (365 * mantissa).
 
     Args:
-        rate: borrow rate or supply rate per block
         blocks_per_year: Number of blocks per year as int OR name of protocol to auto-lookup
+        mantissa: Scaling of the rate
+
+    Returns:
+        k: Factor to pass to `calculate_apy_from_rate_factor`
     """  # NOQA
     if isinstance(blocks_per_year, str):
+        if mantissa == APY_MANTISSA:
+            return _APY_K[blocks_per_year]  # Precomputed for the common case
         blocks_per_year = BLOCKS_PER_YEAR[
             blocks_per_year
         ]  # Fetch from lookup using protocol
-    try:
-        apy = (
-            100
-            + ((((rate / mantissa * blocks_per_year / 365 + 1) ** 365 - 1)) - 1) * 100
-        )
-    except OverflowError:
-        apy = np.nan
+    return blocks_per_year / (365.0 * mantissa)
+
+
+def calculate_apy_from_rate_factor(
+    rate: Union[int, float, ArrayLike], k: float
+) -> Union[float, np.ndarray]:
+    """
+    Calculate APY from per-block rate(s) given a precomputed factor from
+    `apy_rate_factor`. Use this in loops to resolve the factor only once.
+
+    Args:
+        rate: borrow rate or supply rate per block, either a scalar or an
+            array of rates to convert in one vectorized pass
+        k: Rate factor from `apy_rate_factor`
+
+    Returns:
+        apy: APY as float for scalar input, otherwise as array. Rates that
+            overflow come back as NaN
+    """
+    rate = np.asarray(rate, dtype=np.float64)
+    # Equivalent to ((1 + rate * k) ** 365 - 1) * 100, but numerically stable
+    with np.errstate(over="ignore", invalid="ignore"):
+        apy = 100 * np.expm1(365 * np.log1p(rate * k))
+    apy = np.where(np.isfinite(apy), apy, np.nan)
+    if apy.ndim == 0:
+        return float(apy)
     return apy
+
+
+def calculate_apy_from_rate(
+    rate: Union[int, float, ArrayLike],
+    blocks_per_year: Union[int, str],
+    mantissa: int,
+) -> Union[float, np.ndarray]:
+    """
+    Given borrow or supply rate and blocks per year, calculate equivalent APY.
+    Ref: https://docs.strike.org/getting-started/protocol-math/calculating-the-apy-using-rate-per-block
+
+    Args:
+        rate: borrow rate or supply rate per block, either a scalar or an
+            array of rates to convert in one vectorized pass
+        blocks_per_year: Number of blocks per year as int OR name of protocol to auto-lookup
+        mantissa: Scaling of the rate
+
+    Returns:
+        apy: APY as float for scalar input, otherwise as array. Rates that
+            overflow come back as NaN
+    """  # NOQA
+    return calculate_apy_from_rate_factor(
+        rate, apy_rate_factor(blocks_per_year, mantissa)
+    )
+
+
+def calculate_utilization_rate(
+    borrows: ArrayLike, cash: ArrayLike
+) -> Union[float, np.ndarray]:
+    """
+    Calculate utilization rate in percent as borrows / (borrows + cash).
+
+    Args:
+        borrows: total borrows, scalar or array
+        cash: available cash, scalar or array matching `borrows`
+
+    Returns:
+        utilization_rate: Utilization in percent. NaN where there's no supply
+    """
+    borrows = np.asarray(borrows, dtype=np.float64)
+    total_supply = borrows + np.asarray(cash, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(total_supply > 0, borrows / total_supply * 100, np.nan)
+    if rate.ndim == 0:
+        return float(rate)
+    return rate
@@ -1,25 +1,143 @@
 """
 Adapters for external databases via SQLAlchemy ORM.
 """
+from adapters.apis.util import json_loads
+import asyncio
 import json
 import logging
+import math
+import numbers
+import os
+import tempfile
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Integer, Float, String
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine
+from itertools import chain, islice
+from sqlalchemy import DateTime, Engine, Integer, Insert, Float, String, create_engine
+from sqlalchemy import insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, scoped_session
 from sqlalchemy.orm import sessionmaker
+from threading import Lock, get_ident
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 from urllib.parse import quote_plus  # Needed for credential conditioning
 import typer
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 app = typer.Typer()
-Base = declarative_base()
+
+
+class Base(DeclarativeBase):
+    """Declarative base class for all models in this module."""
+
+
+def chunked(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Groups an iterable into lists of at most `size` items, so large inserts
+    can be sent in bounded batches without materializing every row.
+
+    Args:
+        rows: Items to group, e.g. a generator of insert rows
+        size: Maximum number of items per batch
+
+    Returns:
+        batches: Iterator over lists of items
+    """
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _column_keys(cls: type) -> tuple:
+    """
+    Returns the (attribute key, column name) pairs of a mapped class, computed
+    once and cached on the class.
+
+    Args:
+        cls: SQLAlchemy mapped class
+
+    Returns:
+        keys: Tuple of (attribute key, column name) pairs
+    """
+    keys = cls.__dict__.get("_col_keys")
+    if keys is None:
+        keys = tuple((p.key, p.columns[0].name) for p in inspect(cls).column_attrs)
+        cls._col_keys = keys
+    return keys
+
+
+def dump_event(d: Any) -> str:
+    """
+    Serializes an event payload to compact JSON for RawEvent.event. Uses
+    orjson when available (which also serializes numpy values), otherwise
+    json.dumps without whitespace. Payloads orjson rejects, e.g. integers
+    beyond 64 bits, also fall back to json.dumps.
+
+    Note that orjson writes float NaN and infinity as null, where json.dumps
+    writes NaN/Infinity literals that are not valid JSON.
+
+    Args:
+        d: JSON-serializable payload
+
+    Returns:
+        s: JSON string
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(d, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            pass
+    return json.dumps(d, separators=(",", ":"))
+
+
+def load_json(path: str) -> Any:
+    """
+    Loads a JSON file such as a history export, reading it in one go and
+    parsing it with json_loads (orjson, or json.loads when the file may hold
+    integers beyond 64 bits).
+
+    Args:
+        path: Path of the JSON file to load
+
+    Returns:
+        data: Parsed JSON payload
+    """
+    with open(path, "rb") as f:
+        return json_loads(f.read())
+
+
+def iter_json_items(path: str) -> Iterator[Any]:
+    """
+    Yields the items of a JSON file whose top level is an array, one at a
+    time. Uses ijson when available so the whole file is never parsed into
+    one list, otherwise falls back to load_json.
+
+    Args:
+        path: Path of the JSON file to read
+
+    Returns:
+        items: Iterator over the top-level array items
+    """
+    if ijson is None:
+        yield from load_json(path)
+        return
+    with open(path, "rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
 
 
 def record_to_str(o: Base) -> str:
     """
     Creates string representation of SQLAlchemy record.
-    TODO: consider placing this as __str__ definition in Base for all
-    SQLAlchemy objects to inheerit.
 
     Args:
         o: SQLAlchemy record object
@@ -27,12 +145,169 @@ def record_to_str(o: Base) -> str:
     Returns:
         s: String representation
     """
-    d = {}
-    for c in o.__table__.columns:
-        d[c.name] = getattr(o, c.name)
+    # Read loaded values straight from the instance dict, going through the
+    # attribute descriptor only for unloaded (expired or deferred) columns
+    state = o.__dict__
+    d = {
+        name: state[key] if key in state else getattr(o, key)
+        for key, name in _column_keys(type(o))
+    }
     return str(d)
 
 
+def _conn_url(
+    driver: str, username: str, password: str, hostname: str, port: str, database: str
+) -> str:
+    """
+    Builds a SQLAlchemy connection URL with the password quoted.
+
+    Args:
+        driver: SQLAlchemy dialect+driver, e.g. "mysql+pymysql"
+        username: Username to connect with
+        password: password to use
+        hostname: name of host to connect to
+        port: Port to use
+        database: Name of database to use
+
+    Returns:
+        conn_url: Connection URL string
+    """
+    return f"{driver}://{username}:{quote_plus(password)}@{hostname}:{port}/{database}"
+
+
+# Minimum row count for which load_data_infile beats an executemany INSERT
+LOAD_DATA_MIN_ROWS = 1024
+
+# Escapes for MySQL LOAD DATA text fields (default ESCAPED BY '\\')
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _tsv_field(v: Any) -> str:
+    """
+    Formats a value as a tab-separated LOAD DATA field.
+
+    Args:
+        v: Value to format
+
+    Returns:
+        field: Escaped field text, with NULL written as \\N. Non-finite floats
+            (NaN, inf) are written as NULL too, instead of as "nan"/"inf" text
+    """
+    if v is None:
+        return "\\N"
+    if (
+        isinstance(v, numbers.Real)
+        and not isinstance(v, numbers.Integral)
+        and not math.isfinite(v)
+    ):
+        return "\\N"
+    if isinstance(v, datetime):
+        return v.isoformat(" ")
+    return str(v).translate(_TSV_ESCAPES)
+
+
+def _quote_ident(name: str) -> str:
+    """
+    Quotes a MySQL identifier such as a table or column name.
+
+    Args:
+        name: Identifier to quote
+
+    Returns:
+        quoted: Backtick-quoted identifier
+    """
+    return "`" + name.replace("`", "``") + "`"
+
+
+# Engines shared by DatabaseAdapter instances, keyed on URL and pool settings
+_ENGINES: Dict[tuple, Engine] = {}
+_ENGINES_LOCK = Lock()
+
+
+def _build_engine(
+    conn_url: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    pool_pre_ping: bool,
+    pool_recycle: int,
+    local_infile: bool = False,
+) -> Engine:
+    """
+    Returns the engine for a connection URL and pool settings, creating it on
+    first use. Adapters opened with the same parameters in one process then
+    share a single connection pool instead of each opening their own.
+
+    Args:
+        conn_url: Connection URL
+        pool_size: Number of connections to keep open in the pool
+        max_overflow: Number of extra connections allowed beyond pool_size
+        pool_timeout: Seconds to wait for a free connection before giving up
+        pool_pre_ping: Test connections on checkout
+        pool_recycle: Seconds after which connections are recycled
+        local_infile: Allow LOAD DATA LOCAL INFILE on the connections
+
+    Returns:
+        engine: Shared SQLAlchemy engine
+    """
+    key = (
+        conn_url,
+        pool_size,
+        max_overflow,
+        pool_timeout,
+        pool_pre_ping,
+        pool_recycle,
+        local_infile,
+    )
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            # A larger compiled-statement cache lets repeated inserts across
+            # all models skip SQL compilation. PyMySQL already rewrites
+            # executemany INSERTs into multi-row VALUES statements, so no batch
+            # mode is needed. Statements that go through SQLAlchemy's own
+            # insertmanyvalues batching (e.g. with RETURNING) use larger pages
+            engine = create_engine(
+                conn_url,
+                query_cache_size=1200,
+                insertmanyvalues_page_size=5000,
+                future=True,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_pre_ping=pool_pre_ping,
+                pool_recycle=pool_recycle,
+                connect_args={"local_infile": True} if local_infile else {},
+            )
+            _ENGINES[key] = engine
+    return engine
+
+
+def close_all_engines() -> None:
+    """
+    Disposes and forgets every engine shared by DatabaseAdapter instances.
+    Adapters created afterwards open new engines.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    with _ENGINES_LOCK:
+        engines = list(_ENGINES.values())
+        _ENGINES.clear()
+    for engine in engines:
+        engine.dispose()
+
+
+class _StrMixin:
+    """Gives models a readable __str__ listing their column values."""
+
+    def __str__(self) -> str:
+        return record_to_str(self)
+
+
 class DatabaseAdapter:
     """
     Convenience adapter to initialize database connections and execute
@@ -47,6 +322,12 @@ class DatabaseAdapter:
         password: str,
         database: str,
         port: str,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        pool_timeout: float = 30,
+        pool_pre_ping: bool = True,
+        pool_recycle: int = 1800,
+        local_infile: bool = False,
     ) -> None:
         """
         Initializes a SQLAlchemy database connection engine.
@@ -58,15 +339,44 @@ class DatabaseAdapter:
                 not explicitly stored)
             database: Name of database to use
             port: Port to use
+            pool_size: Number of connections to keep open in the pool
+            max_overflow: Number of extra connections allowed beyond pool_size
+            pool_timeout: Seconds to wait for a free connection before giving up
+            pool_pre_ping: Test connections on checkout so dropped ones are
+                replaced transparently
+            pool_recycle: Seconds after which connections are recycled, to stay
+                under the MySQL server's wait_timeout
+            local_infile: Enable LOAD DATA LOCAL INFILE, needed by
+                load_data_infile. The server must also allow local_infile
         """
         # Define engine used to create sessions, without storing password
         self.hostname = hostname
         self.username = username
         self.database = database
         self.port = port
-        conn_url = f"mysql+pymysql://{self.username}:{quote_plus(password)}@{self.hostname}:{self.port}/{self.database}"  # NOQA
-        self._engine = create_engine(conn_url)
+        conn_url = _conn_url(
+            "mysql+pymysql", username, password, hostname, port, database
+        )
+        self._engine = _build_engine(
+            conn_url,
+            pool_size,
+            max_overflow,
+            pool_timeout,
+            pool_pre_ping,
+            pool_recycle,
+            local_infile,
+        )
         self._sessionmaker = sessionmaker(bind=self._engine)
+        # One reusable session per thread, see session_for_thread
+        self._scoped = scoped_session(self._sessionmaker, scopefunc=get_ident)
+
+    @property
+    def engine(self) -> Engine:
+        """
+        The underlying engine, for Core statements that need no session, e.g.
+        `with db.engine.begin() as conn: conn.execute(stmt, rows)`.
+        """
+        return self._engine
 
     def create_session(self) -> sessionmaker.object_session:
         """
@@ -80,76 +390,337 @@ class DatabaseAdapter:
         """
         return self._sessionmaker()
 
+    def session_for_thread(self) -> sessionmaker.object_session:
+        """
+        Returns the calling thread's session, creating it on first use. Worker
+        threads should use this instead of sharing one session, and call
+        close_thread_session when they finish.
 
-class CreamFinanceState(Base):
-    """SQLAlchemy object to represent a Cream Finance state."""
+        Args:
+            None
 
-    __tablename__ = "cream_finance_states"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(DateTime)
-    address = Column(String)
-    comptroller = Column(String)
-    symbol = Column(String)
-    underlying_symbol = Column(String)
-    borrow_apy = Column(Float)
-    supply_apy = Column(Float)
-    utilization_rate = Column(Float)
-    cash = Column(Float)
-    cashUSD = Column(Float)
-    totalBorrows = Column(Float)
-    totalBorrowsUSD = Column(Float)
-    totalReserves = Column(Float)
-    totalReservesUSD = Column(Float)
-    borrowRatePerBlock = Column(Float)
-    supplyRatePerBlock = Column(Float)
-    exchangeRate = Column(Float)
-    underlyingDecimals = Column(Integer)
-    price = Column(Float)
+        Returns:
+            session object
+        """
+        return self._scoped()
 
-    def __str__(self) -> str:
-        return record_to_str(self)
+    def close_thread_session(self) -> None:
+        """
+        Closes and forgets the calling thread's session, if any.
+
+        Args:
+            None
 
+        Returns:
+            None
+        """
+        self._scoped.remove()
 
-class RawEvent(Base):
+    def dispose(self) -> None:
+        """
+        Closes all pooled connections. The engine is shared with any other
+        adapter opened with the same parameters; they reconnect on next use.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._engine.dispose()
+
+    def reset_after_fork(self) -> None:
+        """
+        Call first thing in a child process (e.g. multiprocessing worker)
+        that inherited this adapter. Drops the inherited pool without closing
+        its connections, which still belong to the parent, so the child opens
+        its own.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._engine.dispose(close=False)
+
+    def bulk_insert(self, model: Base, rows: Sequence[Dict[str, Any]]) -> None:
+        """
+        Inserts many rows in a single executemany INSERT and commits. Faster
+        than adding ORM objects one by one to a session.
+
+        Args:
+            model: SQLAlchemy model class to insert into, e.g. RawEvent
+            rows: List of dicts mapping attribute name to value
+
+        Returns:
+            None
+        """
+        self.insert_rows(insert(model), rows)
+
+    def insert_rows(self, stmt: Insert, rows: Sequence[Dict[str, Any]]) -> None:
+        """
+        Executes a prebuilt INSERT statement, e.g. INSERT_RAW_EVENT, over
+        many rows and commits. Reusing one statement object skips rebuilding
+        it per call.
+
+        Args:
+            stmt: INSERT statement to execute
+            rows: List of dicts mapping attribute name to value
+
+        Returns:
+            None
+        """
+        if not rows:
+            return
+        with self.create_session() as session:
+            session.execute(stmt, rows)
+            session.commit()
+
+    def load_data_infile(self, model: Base, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Bulk loads rows with MySQL LOAD DATA LOCAL INFILE and commits. The rows
+        are streamed to a temporary tab-separated file, so no statement or ORM
+        object is built per row. Much faster than INSERTs for large imports
+        (see LOAD_DATA_MIN_ROWS); requires the adapter to be created with
+        local_infile=True.
+
+        Args:
+            model: SQLAlchemy model class to load into, e.g. RawEvent
+            rows: Dicts mapping attribute name to value. Columns missing from
+                every row (e.g. an autoincrement id) are left to the server
+
+        Returns:
+            n: Number of rows loaded
+
+        Raises:
+            RuntimeError: If the server rejected or skipped any row, or raised
+                warnings while converting values. With LOCAL, MySQL reports
+                such errors as warnings instead of failing, so they are
+                checked explicitly and the load is rolled back
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        keys = [(k, name) for k, name in _column_keys(model) if k in first]
+        fd, path = tempfile.mkstemp(suffix=".tsv")
+        try:
+            n_written = 0
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                for row in chain((first,), rows):
+                    f.write("\t".join(_tsv_field(row.get(k)) for k, _ in keys))
+                    f.write("\n")
+                    n_written += 1
+            columns = ", ".join(_quote_ident(name) for _, name in keys)
+            # The file path is passed as a parameter so the driver quotes it
+            sql = (
+                "LOAD DATA LOCAL INFILE %s "
+                f"INTO TABLE {_quote_ident(model.__tablename__)} "
+                "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' "
+                f"LINES TERMINATED BY '\\n' ({columns})"
+            )
+            with self._engine.begin() as conn:
+                n_loaded = conn.exec_driver_sql(sql, (path,)).rowcount
+                n_warnings = conn.exec_driver_sql("SHOW COUNT(*) WARNINGS").scalar()
+                if n_warnings or n_loaded != n_written:
+                    warnings = conn.exec_driver_sql("SHOW WARNINGS LIMIT 5").all()
+                    # Raising inside the block rolls the load back
+                    raise RuntimeError(
+                        f"LOAD DATA loaded {n_loaded} of {n_written} rows with "
+                        f"{n_warnings} warning(s), e.g. {warnings}"
+                    )
+                return n_loaded
+        finally:
+            os.remove(path)
+
+
+class AsyncDatabaseAdapter:
+    """
+    Asyncio counterpart of DatabaseAdapter. Sessions are AsyncSession objects,
+    so many concurrent fetch tasks can share one bounded connection pool
+    without a thread per in-flight query.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        username: str,
+        password: str,
+        database: str,
+        port: str,
+        pool_size: int = 20,
+        max_overflow: int = 0,
+        pool_timeout: float = 30,
+        pool_pre_ping: bool = True,
+        pool_recycle: int = 1800,
+        connect_args: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Initializes a SQLAlchemy async database connection engine.
+
+        Args:
+            hostname: name of host to connect to
+            username: Username to connect with
+            password: password to use (used only to create engine,
+                not explicitly stored)
+            database: Name of database to use
+            port: Port to use
+            pool_size: Number of connections to keep open in the pool
+            max_overflow: Number of extra connections allowed beyond pool_size
+            pool_timeout: Seconds to wait for a free connection before giving up
+            pool_pre_ping: Test connections on checkout so dropped ones are
+                replaced transparently
+            pool_recycle: Seconds after which connections are recycled, to stay
+                under the MySQL server's wait_timeout
+            connect_args: Extra keyword arguments for aiomysql.connect, e.g.
+                {"ssl": ssl_context}. aiomysql ignores URL query parameters
+                such as sslmode, so SSL must be configured here.
+        """
+        self.hostname = hostname
+        self.username = username
+        self.database = database
+        self.port = port
+        conn_url = _conn_url(
+            "mysql+aiomysql", username, password, hostname, port, database
+        )
+        self._engine = create_async_engine(
+            conn_url,
+            query_cache_size=1200,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_pre_ping=pool_pre_ping,
+            pool_recycle=pool_recycle,
+            connect_args=connect_args or {},
+        )
+        # Keep attributes loaded after commit, since lazy refreshes would need
+        # an implicit await
+        self._sessionmaker = async_sessionmaker(self._engine, expire_on_commit=False)
+
+    def create_session(self) -> AsyncSession:
+        """
+        Creates and returns a new async database session. Use it as
+        `async with db.create_session() as session: ...`.
+
+        Args:
+            None
+
+        Returns:
+            AsyncSession object
+        """
+        return self._sessionmaker()
+
+    async def dispose(self) -> None:
+        """
+        Closes all pooled connections.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        await self._engine.dispose()
+
+    async def bulk_insert(self, model: Base, rows: Sequence[Dict[str, Any]]) -> None:
+        """
+        Inserts many rows in a single executemany INSERT and commits.
+
+        Args:
+            model: SQLAlchemy model class to insert into, e.g. RawEvent
+            rows: List of dicts mapping attribute name to value
+
+        Returns:
+            None
+        """
+        await self.insert_rows(insert(model), rows)
+
+    async def insert_rows(self, stmt: Insert, rows: Sequence[Dict[str, Any]]) -> None:
+        """
+        Executes a prebuilt INSERT statement, e.g. INSERT_RAW_EVENT, over
+        many rows and commits.
+
+        Args:
+            stmt: INSERT statement to execute
+            rows: List of dicts mapping attribute name to value
+
+        Returns:
+            None
+        """
+        if not rows:
+            return
+        async with self.create_session() as session:
+            await session.execute(stmt, rows)
+            await session.commit()
+
+
+class CreamFinanceState(_StrMixin, Base):
+    """SQLAlchemy object to represent a Cream Finance state."""
+
+    __tablename__ = "cream_finance_states"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    address: Mapped[Optional[str]] = mapped_column(String)
+    comptroller: Mapped[Optional[str]] = mapped_column(String)
+    symbol: Mapped[Optional[str]] = mapped_column(String)
+    underlying_symbol: Mapped[Optional[str]] = mapped_column(String)
+    borrow_apy: Mapped[Optional[float]] = mapped_column(Float)
+    supply_apy: Mapped[Optional[float]] = mapped_column(Float)
+    utilization_rate: Mapped[Optional[float]] = mapped_column(Float)
+    cash: Mapped[Optional[float]] = mapped_column(Float)
+    cashUSD: Mapped[Optional[float]] = mapped_column(Float)
+    totalBorrows: Mapped[Optional[float]] = mapped_column(Float)
+    totalBorrowsUSD: Mapped[Optional[float]] = mapped_column(Float)
+    totalReserves: Mapped[Optional[float]] = mapped_column(Float)
+    totalReservesUSD: Mapped[Optional[float]] = mapped_column(Float)
+    borrowRatePerBlock: Mapped[Optional[float]] = mapped_column(Float)
+    supplyRatePerBlock: Mapped[Optional[float]] = mapped_column(Float)
+    exchangeRate: Mapped[Optional[float]] = mapped_column(Float)
+    underlyingDecimals: Mapped[Optional[int]] = mapped_column(Integer)
+    price: Mapped[Optional[float]] = mapped_column(Float)
+
+
+class RawEvent(_StrMixin, Base):
     """SQLAlchemy object to represent a raw event."""
 
     __tablename__ = "events_raw"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(DateTime)
-    event = Column(String)
-    metadata_ = Column("metadata", String)
-    source = Column(String)
-
-    def __str__(self) -> str:
-        return record_to_str(self)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    event: Mapped[Optional[str]] = mapped_column(String)
+    metadata_: Mapped[Optional[str]] = mapped_column("metadata", String)
+    source: Mapped[Optional[str]] = mapped_column(String)
 
 
-class AlphaHomoraPool(Base):
+class AlphaHomoraPool(_StrMixin, Base):
     """SQLAlchemy object to represent a Alpha Homora Pool data."""
 
     __tablename__ = "alpha_homora_pools_scrape"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(DateTime)
-    chain = Column(String)
-    strategy = Column(String)
-    pool = Column(String)
-    protocol = Column(String)
-    leverage_min = Column(Float)
-    leverage_max = Column(Float)
-    leverage_highest_apr = Column(Float)
-    apr_min = Column(Float)
-    apr_max = Column(Float)
-    apy_trading_fee = Column(Float)
-    apr_farming = Column(Float)
-    apr_reward = Column(Float)
-    apy_borrow = Column(Float)
-    trading_volume_24h = Column(Float)
-    tvl_pool = Column(Float)
-    tvl_homora = Column(Float)
-    positions = Column(Integer)
-
-    def __str__(self) -> str:
-        return record_to_str(self)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    chain: Mapped[Optional[str]] = mapped_column(String)
+    strategy: Mapped[Optional[str]] = mapped_column(String)
+    pool: Mapped[Optional[str]] = mapped_column(String)
+    protocol: Mapped[Optional[str]] = mapped_column(String)
+    leverage_min: Mapped[Optional[float]] = mapped_column(Float)
+    leverage_max: Mapped[Optional[float]] = mapped_column(Float)
+    leverage_highest_apr: Mapped[Optional[float]] = mapped_column(Float)
+    apr_min: Mapped[Optional[float]] = mapped_column(Float)
+    apr_max: Mapped[Optional[float]] = mapped_column(Float)
+    apy_trading_fee: Mapped[Optional[float]] = mapped_column(Float)
+    apr_farming: Mapped[Optional[float]] = mapped_column(Float)
+    apr_reward: Mapped[Optional[float]] = mapped_column(Float)
+    apy_borrow: Mapped[Optional[float]] = mapped_column(Float)
+    trading_volume_24h: Mapped[Optional[float]] = mapped_column(Float)
+    tvl_pool: Mapped[Optional[float]] = mapped_column(Float)
+    tvl_homora: Mapped[Optional[float]] = mapped_column(Float)
+    positions: Mapped[Optional[int]] = mapped_column(Integer)
+
+
+# Prebuilt INSERT statements for DatabaseAdapter.insert_rows
+INSERT_CREAM_FINANCE_STATE = insert(CreamFinanceState)
+INSERT_RAW_EVENT = insert(RawEvent)
+INSERT_ALPHA_HOMORA_POOL = insert(AlphaHomoraPool)
 
 
 @app.command()
@@ -163,38 +734,75 @@ def run_example(
     """
     Runs an example generation of raw event and saves to database.
     Example that creates a sample object, writes it to a database, and reads it back
-    in a second commit.
+    in a second commit. When writing lists of records, use
+    `AsyncDatabaseAdapter.insert_rows` instead of adding objects one at a time.
     """
-    # Create database adapter
-    db = DatabaseAdapter(hostname, username, password, database, port)
+    asyncio.run(_run_example(username, hostname, database, port, password))
+
 
-    # Intialize a session
-    session = db.create_session()
+async def _run_example(
+    username: str, hostname: str, database: str, port: int, password: str
+) -> None:
+    """
+    Async body of run_example.
+
+    Args:
+        username: Username to connect with
+        hostname: name of host to connect to
+        database: Name of database to use
+        port: Port to use
+        password: password to use
+
+    Returns:
+        None
+    """
+    # Create database adapter
+    db = AsyncDatabaseAdapter(hostname, username, password, database, port)
 
     # Create event object
     timestamp = datetime.utcnow()
     event = RawEvent(
         timestamp=timestamp,
-        event=json.dumps({"test": 1234, "foo": {"bar": 1, "baz": 2}}),
+        event=dump_event({"test": 1234, "foo": {"bar": 1, "baz": 2}}),
     )
     logging.info(f"Created event: {event}")
 
-    # Create event
-    session.add(event)
-
-    # Write event
-    logging.info("Persisting event ...")
-    session.commit()
-    logging.info("Persist complete.")
-
-    # Read back event
-    logging.info("Querying for the event using filter ...\n")
-    # results = session.query(RawEvent)
-    results = session.query(RawEvent).order_by(RawEvent.timestamp.desc()).limit(1)
-    logging.info(f"Executed query:\n{str(results)}\n")
-    logging.info("Query Results: ")
-    for r in results:
-        logging.info(r)
+    async with db.create_session() as session:
+        # Create event
+        session.add(event)
+
+        # Write event
+        logging.info("Persisting event ...")
+        await session.commit()
+        logging.info("Persist complete.")
+
+    # Write a batch of events in one INSERT. Use this rather than session.add
+    # in a loop whenever a scrape cycle produces many records
+    rows = [
+        {"timestamp": timestamp, "event": dump_event({"test": i}), "source": "example"}
+        for i in range(3)
+    ]
+    logging.info(f"Bulk inserting {len(rows)} events ...")
+    await db.insert_rows(INSERT_RAW_EVENT, rows)
+    logging.info("Bulk insert complete.")
+
+    async with db.create_session() as session:
+        # Read back event. Selecting only the needed columns returns plain
+        # rows, skipping the metadata blob and mapped-object construction.
+        # Use select(RawEvent).options(load_only(...)) when entities are needed
+        logging.info("Querying for the event using filter ...\n")
+        query = (
+            select(RawEvent.id, RawEvent.timestamp, RawEvent.event)
+            .order_by(RawEvent.timestamp.desc())
+            .limit(1)
+        )
+        logging.info(f"Executed query:\n{str(query)}\n")
+        results = await session.execute(query)
+        logging.info("Query Results: ")
+        for event_id, ts, event_str in results:
+            logging.info(f"id={event_id} timestamp={ts} event={event_str}")
+
+    await db.dispose()
 
 
 if __name__ == "__main__":
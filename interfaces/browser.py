@@ -3,16 +3,72 @@ Selenium browser driver support functions including metamask
 extension integration and wallet loading.
 """
 import logging
-from selenium import webdriver
-from time import sleep
-from typing import Optional, Sequence, Union
+from typing import TYPE_CHECKING, Optional, Sequence, Union
+import warnings
+
+# Selenium is imported inside the functions that use it, so importing this
+# module does not load the whole webdriver package
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+# Writes arguments[0][i] into the seed input with id ending in "word-<i>".
+# Looks inputs up directly by Metamask's id ("import-srp__srp-word-<i>"),
+# indexing all inputs by id in one pass only if the DOM differs. Uses the
+# native value setter and dispatches an input event so React picks up the
+# change. Returns the number of inputs filled.
+SEED_FILL_JS = """
+const words = arguments[0];
+const setValue = Object.getOwnPropertyDescriptor(
+    HTMLInputElement.prototype, "value"
+).set;
+let inputs = words.map(
+    (_, i) => document.getElementById("import-srp__srp-word-" + i)
+);
+if (inputs.includes(null)) {
+    const byIndex = new Map();
+    for (const el of document.querySelectorAll("input[id*='word-']")) {
+        const m = el.id.match(/word-(\\d+)$/);
+        if (m !== null && !byIndex.has(Number(m[1]))) {
+            byIndex.set(Number(m[1]), el);
+        }
+    }
+    inputs = words.map((_, i) => byIndex.get(i) || null);
+}
+let filled = 0;
+inputs.forEach((el, i) => {
+    if (el === null) {
+        return;
+    }
+    setValue.call(el, words[i]);
+    el.dispatchEvent(new Event("input", { bubbles: true }));
+    filled++;
+});
+return filled;
+"""
+
+# Clicks the first button whose text is arguments[0]. Returns whether it was
+# found, so it can be polled by WebDriverWait until the button renders.
+CLICK_BUTTON_JS = """
+const button = document.evaluate(
+    "//button[text()='" + arguments[0] + "']",
+    document,
+    null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE,
+    null
+).singleNodeValue;
+if (button === null || button.disabled) {
+    return false;
+}
+button.click();
+return true;
+"""
 
 
 def init_driver_firefox(
     executable_path: Optional[str] = None,
     extension_paths: Optional[Sequence[str]] = None,
     headless: bool = True,
-) -> webdriver.Firefox:
+) -> "webdriver.Firefox":
     """
     Initializes Selenium Firefox webdriver.
     Also optionally installs provided extensions
@@ -24,6 +80,8 @@ def init_driver_firefox(
     Returns:
         driver: Initialized driver
     """
+    from selenium import webdriver
+
     opts = webdriver.FirefoxOptions()
     opts.headless = headless
     if executable_path:
@@ -41,11 +99,96 @@ def init_driver_firefox(
     return driver
 
 
+def init_driver_chrome(
+    executable_path: Optional[str] = None,
+    extension_paths: Optional[Sequence[str]] = None,
+    headless: bool = True,
+) -> "webdriver.Chrome":
+    """
+    Initializes Selenium Chrome/Chromium webdriver, which uses less memory
+    and starts faster than Firefox.
+    Also optionally installs provided extensions
+
+    Args:
+        executable_path: Path to chromedriver executable. Defaults to looking in
+            PATH
+        extension_paths: Optional list of packed extension files (e.g. .crx type)
+        headless: Flag to run headless. Uses Chrome's new headless mode, since
+            the old one cannot load extensions
+    Returns:
+        driver: Initialized driver
+    """
+    from selenium import webdriver
+
+    opts = webdriver.ChromeOptions()
+    if headless:
+        opts.add_argument("--headless=new")
+    opts.add_argument("--disable-gpu")
+    opts.add_argument("--disable-dev-shm-usage")
+    if extension_paths:
+        for ep in extension_paths:
+            logging.debug(f"Initialize extension file: {ep}")
+            opts.add_extension(ep)
+    if executable_path:
+        logging.debug(f"Initializing Chrome driver using executable: {executable_path}")
+        driver = webdriver.Chrome(options=opts, executable_path=executable_path)
+    else:
+        driver = webdriver.Chrome(options=opts)
+
+    return driver
+
+
+def click_button(
+    driver: Union["webdriver.Chrome", "webdriver.Firefox"],
+    text: str,
+    timeout: float = 10.0,
+) -> None:
+    """
+    Clicks the button with the given text as soon as it is rendered and
+    enabled. Each poll is a single script round-trip.
+
+    Args:
+        driver: Web driver
+        text: Exact button text
+        timeout: Maximum seconds to wait for the button
+
+    Returns:
+        None
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script(CLICK_BUTTON_JS, text),
+        message=f'Button "{text}" not clickable after {timeout}s',
+    )
+
+
+def _wait_cap(timeout: float, sleep_sec: Optional[float]) -> float:
+    """
+    Resolves the wait cap of the Metamask helpers, which used to take a fixed
+    `sleep_sec` before waiting on page elements replaced it with `timeout`.
+
+    Args:
+        timeout: Maximum seconds to wait
+        sleep_sec: Deprecated alias of timeout, used instead if not None
+
+    Returns:
+        timeout: Maximum seconds to wait
+    """
+    if sleep_sec is None:
+        return timeout
+    warnings.warn(
+        "sleep_sec is deprecated, use timeout instead", DeprecationWarning, stacklevel=3
+    )
+    return sleep_sec
+
+
 def load_wallet_metamask(
-    driver: Union[webdriver.Chrome, webdriver.Firefox],
+    driver: Union["webdriver.Chrome", "webdriver.Firefox"],
     wallet_seed: Sequence[str],
     wallet_password: str,
-    sleep_sec: Optional[float] = 3.0,
+    timeout: float = 10.0,
+    sleep_sec: Optional[float] = None,
 ) -> None:
     """
     Loads a wallet into metamask extension.
@@ -57,47 +200,46 @@ def load_wallet_metamask(
         driver: Web driver
         wallet_seed: N-word seed phrase to use for wallet
         wallet_password: Password to keep for wallet in this session
-        sleep_sec: Optional duration to sleep between metamask click actions
+        timeout: Maximum seconds to wait for each metamask page to render
+        sleep_sec: Deprecated alias of timeout, kept for older callers. If
+            given, it overrides timeout
 
     Returns:
         None
     """
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    timeout = _wait_cap(timeout, sleep_sec)
+
     # Click setup buttons
-    driver.find_element_by_xpath('//button[text()="Get Started"]').click()
-    driver.find_element_by_xpath('//button[text()="Import wallet"]').click()
-    driver.find_element_by_xpath('//button[text()="No Thanks"]').click()
+    for text in ("Get Started", "Import wallet", "No Thanks"):
+        click_button(driver, text, timeout)
 
-    # Fill out password page
-    inputs = driver.find_elements_by_xpath("//input")
+    # Fill out seed words in one script call once the inputs have rendered
     seed_splits = wallet_seed.split(" ")
-    for i, seed_word in enumerate(seed_splits):
-        # Cycle through inputs looking for match
-        for el in inputs:
-            attr_id = el.get_attribute("id")
-            if f"word-{i}" in attr_id and "checkbox" not in attr_id:
-                # Found match. Use seed word here
-                el.send_keys(seed_word)
-                break
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script(SEED_FILL_JS, seed_splits) >= len(seed_splits),
+        message="Seed phrase inputs not found",
+    )
 
     # Fill in password
+    inputs = driver.find_elements_by_xpath("//input")
     inputs[-3].send_keys(wallet_password)
     inputs[-2].send_keys(wallet_password)
 
     # Check the box
     inputs[-1].click()
 
-    # Click import button
-    driver.find_element_by_xpath('//button[text()="Import"]').click()
-
-    # Wait a moment and finalize
-    sleep(sleep_sec)
-    driver.find_element_by_xpath('//button[text()="All Done"]').click()
+    # Click import button and finalize once the wallet is created
+    click_button(driver, "Import", timeout)
+    click_button(driver, "All Done", timeout)
 
 
 def load_url_and_connect_metamask(
-    driver: Union[webdriver.Chrome, webdriver.Firefox],
+    driver: Union["webdriver.Chrome", "webdriver.Firefox"],
     url: str,
-    sleep_sec: Optional[float] = 5.0,
+    timeout: float = 15.0,
+    sleep_sec: Optional[float] = None,
 ) -> None:
     """
     Connect metamask to site by pressing all the connect buttons.
@@ -107,23 +249,37 @@ def load_url_and_connect_metamask(
     Ar:
         driver: Web driver
         url: URL to load
-        sleep_sec: Optional time to wait for Metamask to load pages
+        timeout: Maximum seconds to wait for Metamask to load each page
+        sleep_sec: Deprecated alias of timeout, kept for older callers. If
+            given, it overrides timeout
     """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    timeout = _wait_cap(timeout, sleep_sec)
+
+    wait = WebDriverWait(driver, timeout)
+
     # Load page. On first call this will load metamask to approve/switch networks
     orig_handle = driver.current_window_handle
+    orig_handles = driver.window_handles
     driver.get(url)
 
     # Wait for metamask to pop up, switch to tab and connect
-    sleep(sleep_sec)
-
-    # Assumes metamask popped up
+    wait.until(EC.new_window_is_opened(orig_handles))
     driver.switch_to.window(driver.window_handles[-1])
-    driver.find_element_by_xpath('//button[text()="Next"]').click()
-    driver.find_element_by_xpath('//button[text()="Connect"]').click()
+    for text in ("Next", "Connect"):
+        locator = (By.XPATH, f'//button[text()="{text}"]')
+        wait.until(EC.element_to_be_clickable(locator)).click()
 
-    # Refresh ... again ... and wait for full first page load
-    logging.info("Refreshing page.")
-    sleep(sleep_sec)
+    # Wait for metamask to close its popup once connected
+    logging.info("Waiting for Metamask to finish connecting.")
+    try:
+        wait.until(EC.number_of_windows_to_be(len(orig_handles)))
+    except TimeoutException:
+        logging.warning(f"Metamask popup still open after {timeout}s, continuing.")
 
     # Switch back to original handle
     driver.switch_to.window(orig_handle)
@@ -0,0 +1,26 @@
+"""
+Support functions for writing processed records to local files.
+"""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+
+def write_output(df: pd.DataFrame, output_path: str) -> None:
+    """
+    Writes processed records to a Parquet file if the path ends in .parquet,
+    otherwise to CSV through PyArrow's multithreaded CSV writer.
+
+    Args:
+        df: Processed records
+        output_path: File to write
+
+    Returns:
+        None
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if output_path.endswith(".parquet"):
+        pq.write_table(table, output_path)
+    else:
+        pacsv.write_csv(table, output_path)
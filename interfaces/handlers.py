@@ -5,7 +5,7 @@ one that produces messages to Discord channel.
 
 # Requirements:
     - backoff: for managing timeouts/retries
-    - requests: for sending the message
+    - httpx (with the http2 extra): for sending the message
 
 Example usage: See main and run_example() below
 
@@ -15,46 +15,248 @@ That emits an ERROR-level message to the logging console and to Discord.
 
 """
 import argparse
-import backoff
+import functools
 import logging
-import requests
-from typing import Any, Dict, Optional, Union
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
 
-BACKOFF_MAX_TRIES = 8  # With exponential, 7 retries = 30 sec, 8 retries ~1.5 min
+# backoff and httpx are imported on the first message sent, so importing
+# this module (e.g. only for DiscordHandler setup or --help) stays cheap
+if TYPE_CHECKING:
+    import httpx
 
+BACKOFF_MAX_TRIES = 5  # With full-jitter exponential, at most ~15 sec of waiting
+DEFAULT_TIMEOUT = 5.0  # Seconds to wait for Discord before retrying
+QUEUE_MAXSIZE = 1024  # Pending messages kept before new ones are dropped
+COALESCE_MAX = 10  # Most queued messages merged into one webhook post
+DEDUP_WINDOW = 60.0  # Seconds during which a repeated message is dropped
 
-@backoff.on_exception(
-    backoff.expo, requests.exceptions.RequestException, max_tries=BACKOFF_MAX_TRIES
-)
-def send_discord_msg(webhook_url: str, data: Dict[str, str], timeout=None):
+
+@functools.lru_cache(maxsize=None)
+def _default_client() -> "httpx.Client":
+    """
+    Shared HTTP/2 client, so messages multiplex over one keep-alive TLS
+    connection to Discord instead of opening a new one per log record.
+    Retries are left to backoff. Created on first use.
+
+    Args:
+        None
+
+    Returns:
+        client: Module-wide httpx client
+    """
+    import httpx
+
+    return httpx.Client(
+        http2=True,
+        timeout=DEFAULT_TIMEOUT,
+        limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+    )
+
+
+def _utf16_len(s: str) -> int:
+    """
+    Length of a string as counted by Discord, in UTF-16 code units.
+
+    Args:
+        s: String to measure
+
+    Returns:
+        n: Number of UTF-16 code units
+    """
+    if s.isascii():
+        return len(s)
+    return len(s.encode("utf-16-le")) // 2
+
+
+def _truncate_utf16(s: str, limit: int) -> str:
+    """
+    Truncates a string to at most `limit` UTF-16 code units without splitting
+    a surrogate pair. Python slicing counts code points, so characters outside
+    the BMP (e.g. emoji) could push a sliced message over Discord's limit.
+
+    Args:
+        s: String to truncate
+        limit: Maximum length in UTF-16 code units
+
+    Returns:
+        s: Truncated string
+    """
+    # Fast paths: a string this short cannot exceed the limit, and ASCII
+    # strings have one code unit per character
+    if len(s) * 2 <= limit:
+        return s
+    if s.isascii():
+        return s[:limit]
+    return s.encode("utf-16-le")[: 2 * limit].decode("utf-16-le", "ignore")
+
+
+class DuplicateFilter(logging.Filter):
+    """
+    Logging filter that drops a message identical to one let through less
+    than `window` seconds ago, to avoid flooding a channel with a repeating
+    error.
+    """
+
+    def __init__(self, window: float = DEDUP_WINDOW) -> None:
+        """
+        Args:
+            window: Seconds during which a repeated message is dropped
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self._window = window
+        self._last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Args:
+            record: Log record to check
+
+        Returns:
+            keep: False if the same message passed within the window
+        """
+        msg = record.getMessage()
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_seen.get(msg)
+            if last is not None and now - last < self._window:
+                return False
+            self._last_seen[msg] = now
+            # Forget expired messages so memory stays bounded
+            if len(self._last_seen) > 256:
+                self._last_seen = {
+                    m: t for m, t in self._last_seen.items() if now - t < self._window
+                }
+        return True
+
+
+def _retry_after(result: "httpx.Response") -> float:
+    """
+    Seconds Discord asks us to wait before retrying a rate-limited request.
+
+    Args:
+        result: 429 response
+
+    Returns:
+        seconds: Value of the Retry-After header, or 1 if missing
+    """
+    try:
+        return float(result.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1.0
+
+
+def _giveup_rate_limited(details: Dict[str, Any]) -> None:
+    """
+    backoff giveup handler for rate-limited requests.
+
+    Args:
+        details: backoff invocation details
+
+    Returns:
+        None
+    """
+    # Printing since logging can result in infinite loop
+    print(f"Discord still rate limiting after {details['tries']} tries. Giving up.")
+
+
+@functools.lru_cache(maxsize=None)
+def _send_with_backoff() -> Callable:
+    """
+    Wraps _send_discord_msg in retry strategies, importing backoff and
+    httpx on first use. Request errors and 5xx responses are retried with
+    full-jitter exponential backoff. 429 responses are retried after the
+    server's Retry-After delay.
+
+    Args:
+        None
+
+    Returns:
+        send: Retrying version of _send_discord_msg
+    """
+    import backoff
+    import httpx
+
+    retry_errors = backoff.on_exception(
+        backoff.expo,
+        httpx.HTTPError,
+        max_tries=BACKOFF_MAX_TRIES,
+        jitter=backoff.full_jitter,
+    )
+    retry_rate_limited = backoff.on_predicate(
+        backoff.runtime,
+        predicate=lambda r: r.status_code == 429,
+        value=_retry_after,
+        max_tries=BACKOFF_MAX_TRIES,
+        jitter=None,
+        on_giveup=_giveup_rate_limited,
+    )
+    return retry_rate_limited(retry_errors(_send_discord_msg))
+
+
+def _send_discord_msg(
+    webhook_url: str,
+    data: Dict[str, str],
+    timeout: Optional[float] = None,
+    client: Optional["httpx.Client"] = None,
+) -> "httpx.Response":
+    """
+    Single attempt of send_discord_msg. See there for arguments.
+    """
+    client = client or _default_client()
+    result = client.post(webhook_url, json=data, timeout=timeout or DEFAULT_TIMEOUT)
+    if result.status_code >= 500:
+        # Raise so it is retried
+        result.raise_for_status()
+    elif result.status_code >= 400 and result.status_code != 429:
+        # Printing since logging can result in infinite loop
+        print(
+            f"Unable to send message to Discord. Error: {result.status_code} "
+            f"{result.reason_phrase}"
+        )
+    return result
+
+
+def send_discord_msg(
+    webhook_url: str,
+    data: Dict[str, str],
+    timeout: Optional[float] = None,
+    client: Optional["httpx.Client"] = None,
+) -> "httpx.Response":
     """
     Send message to Discord channel via webhook.
-    Wrapped in an exponential backoff strategy
+    Wrapped in jittered exponential backoff, honoring Retry-After when rate
+    limited
 
     Args:
         webhook_url: Discord webhook URL
         data: JSON payload to send, conforming to API spec.
             See: https://discord.com/developers/docs/resources/webhook#execute-webhook
-        timeout: Time to wait in seconds until timeout
+        timeout: Time to wait in seconds until timeout. Defaults to
+            DEFAULT_TIMEOUT
+        client: Optional httpx client to send with. Defaults to the
+            module-wide HTTP/2 client
 
     Returns:
-        None
+        result: Last response received
 
     Raises:
-        RequestException: Any request exception, after backoff complete
+        HTTPError: Any httpx request error, after backoff complete
     """  # NOQA
-    result = requests.post(webhook_url, json=data)
-    try:
-        result.raise_for_status()
-    except Exception as e:
-        # Printing since logging can result in infinite loop
-        print(f"Unable to send message to Discord. Error: {e}")
+    return _send_with_backoff()(webhook_url, data, timeout, client)
 
 
 class DiscordHandler(logging.StreamHandler):
     """
     Python custom logging handler that will send logs to a Discord channel
-    via webhooks
+    via webhooks. Messages are queued by emit and posted from a background
+    thread, so logging never blocks on Discord.
     """
 
     def __init__(
@@ -62,6 +264,8 @@ class DiscordHandler(logging.StreamHandler):
         webhook_url: str,
         level: Union[int, str] = logging.ERROR,
         options: Optional[Dict[str, Any]] = None,
+        client: Optional["httpx.Client"] = None,
+        dedup_window: float = DEDUP_WINDOW,
     ) -> None:
         """
         Set up which broker(s) and topic to produce to upon logging.
@@ -73,6 +277,10 @@ class DiscordHandler(logging.StreamHandler):
                 webhook message. The handler will pack these in with 'content'
                 (i.e. the message). Examples: username, avatar_url, etc.
                 Ref: https://discord.com/developers/docs/resources/webhook#execute-webhook
+            client: Optional httpx client to send with, e.g. a mock in
+                tests. Defaults to the module-wide HTTP/2 client
+            dedup_window: Seconds during which a repeated message is not sent
+                again. Set to 0 to send every message
 
         Returns:
             None
@@ -81,6 +289,9 @@ class DiscordHandler(logging.StreamHandler):
         self._webhook_url = webhook_url
         self._loglevel = level
         self._options = options
+        # Built once; each post merges its content into a copy of it
+        self._payload_template = dict(options) if options else {}
+        self._client = client
         self._MSG_LIMIT = 2000  # Character limit imposed in API
 
         # Initialize
@@ -91,6 +302,13 @@ class DiscordHandler(logging.StreamHandler):
 
         # Set handler logging level
         self.setLevel(level)
+        if dedup_window > 0:
+            self.addFilter(DuplicateFilter(dedup_window))
+
+        # Start background sender
+        self._queue = queue.Queue(maxsize=QUEUE_MAXSIZE)
+        self._sender = threading.Thread(target=self._drain, daemon=True)
+        self._sender.start()
 
     def emit(self, record) -> None:
         """
@@ -107,15 +325,90 @@ class DiscordHandler(logging.StreamHandler):
         msg = self.format(record)
 
         # Honor Discord API character limit
-        msg = msg[: self._MSG_LIMIT]
+        msg = _truncate_utf16(msg, self._MSG_LIMIT)
+
+        # Queue for the sender thread, dropping the message if Discord is too
+        # far behind
+        try:
+            self._queue.put_nowait(msg)
+        except queue.Full:
+            pass
+
+    def _coalesce(self, msgs: List[str]) -> List[str]:
+        """
+        Joins consecutive messages with newlines into as few messages as fit
+        within the Discord character limit.
+
+        Args:
+            msgs: Messages, each already within the limit
+
+        Returns:
+            contents: Merged messages
+        """
+        contents = [msgs[0]]
+        for msg in msgs[1:]:
+            if _utf16_len(contents[-1]) + 1 + _utf16_len(msg) <= self._MSG_LIMIT:
+                contents[-1] = f"{contents[-1]}\n{msg}"
+            else:
+                contents.append(msg)
+        return contents
+
+    def _drain(self) -> None:
+        """
+        Sender thread loop. Takes queued messages, merging bursts of up to
+        COALESCE_MAX into as few webhook posts as possible, until a None
+        sentinel is received.
 
-        # Pack message with other config
-        payload = self._options.copy()
-        payload["content"] = msg
+        Args:
+            None
 
-        # Sends it off
-        logging.debug(f"Sending message to discord: {msg}")
-        send_discord_msg(self._webhook_url, payload)
+        Returns:
+            None
+        """
+        stop = False
+        while not stop:
+            msgs = [self._queue.get()]
+            while len(msgs) < COALESCE_MAX:
+                try:
+                    msgs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in msgs:
+                stop = True
+                msgs = [m for m in msgs if m is not None]
+            if not msgs:
+                continue
+
+            for content in self._coalesce(msgs):
+                # Pack message with other config
+                payload = {**self._payload_template, "content": content}
+
+                # Sends it off
+                logging.debug(f"Sending message to discord: {content}")
+                try:
+                    send_discord_msg(self._webhook_url, payload, client=self._client)
+                except Exception as e:
+                    # Printing since logging can result in infinite loop
+                    print(f"Unable to send message to Discord. Error: {e}")
+
+    def close(self, timeout: float = DEFAULT_TIMEOUT) -> None:
+        """
+        Sends any queued messages, waiting up to `timeout` seconds, and stops
+        the sender thread. Called by logging.shutdown at exit.
+
+        Args:
+            timeout: Seconds to wait for queued messages to be sent
+
+        Returns:
+            None
+        """
+        if self._sender.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._sender.join(timeout)
+        super().close()
 
 
 def run_example(
@@ -12,8 +12,14 @@ Note: This script has too many parameters to be all CLI. So it uses
 a config file for non-password parameters.
 
 """
-from adapters.database_adapter import DatabaseAdapter, AlphaHomoraPool
+from adapters.database_adapter import (
+    DatabaseAdapter,
+    AlphaHomoraPool,
+    INSERT_ALPHA_HOMORA_POOL,
+    chunked,
+)
 from interfaces.browser import (
+    init_driver_chrome,
     init_driver_firefox,
     load_wallet_metamask,
     load_url_and_connect_metamask,
@@ -23,7 +29,12 @@ import jsonlines
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Union
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from sqlalchemy.exc import OperationalError
+from selenium.webdriver.support.ui import WebDriverWait
+from typing import Any, List, Dict, Union
 from time import sleep
 import typer
 import yaml
@@ -50,71 +61,162 @@ FIELD_MAP = {
     "tvl_homora": "TVL via Homora v2",
 }
 
+# Reverse lookup from label text to the field(s) read from the element after it
+LABEL_TO_FIELDS = dict()
+for _field, _label in FIELD_MAP.items():
+    LABEL_TO_FIELDS.setdefault(_label, list()).append(_field)
+
 # Labels that indicate the start of a row
 # WARNING: Can change if site changes
-START_KEYS = ("Yield Farming", "Liquidity Providing")
+START_KEYS = frozenset(("Yield Farming", "Liquidity Providing"))
+
+# Characters dropped from numeric text fields, in one pass
+STRIP_TABLE = str.maketrans("", "", "%$,")
+
+# DOM lookups. CSS selectors run on the browser's native querySelectorAll,
+# which is much faster than XPath class matching
+# WARNING: Can change if site changes
+ROW_TEXT_JS = (
+    "return Array.from("
+    "document.querySelectorAll('.MuiTypography-noWrap'), e => e.innerText)"
+)
+EXPAND_DETAILS_JS = """
+const buttons = [...document.querySelectorAll("span")].filter(
+    (e) => e.textContent === "See details"
+);
+buttons.forEach((e) => e.click());
+return buttons.length;
+"""
 
 
 # click through to diffeerent network
-def click_chain(driver, chain_name, chains=("Ethereum", "Fantom", "Avalanche")):
+def click_chain(
+    driver,
+    chain_name,
+    chains=("Ethereum", "Fantom", "Avalanche"),
+    timeout=5.0,
+    popup_timeout=2.0,
+):
     # Store current window before doing stuff
     cur_handle = driver.current_window_handle
+    handles_before = set(driver.window_handles)
+    wait = WebDriverWait(driver, timeout)
 
-    # Click network change button at top.
-    for c in chains:
-        try:
-            driver.find_element_by_xpath(f'//span[text()="{c}"]').click()
-            break
-        except Exception as e:  # NOQA
-            sleep(0.5)
-            continue
+    # Click network change button at top, which shows the current chain
+    current_chain = " or ".join(f"text()='{c}'" for c in chains)
+    locator = (By.XPATH, f"//span[{current_chain}]")
+    wait.until(EC.element_to_be_clickable(locator)).click()
 
     # Select the chain
-    driver.find_element_by_xpath(f'//p[text()="{chain_name}"]').click()
-    sleep(1)
-
-    # Try going to metamask if it pops up
-    sleep(2)  # wait a moment for metamask window to load
-    driver.switch_to.window(driver.window_handles[-1])
+    locator = (By.XPATH, f'//p[text()="{chain_name}"]')
+    wait.until(EC.element_to_be_clickable(locator)).click()
 
-    # Click metamask if it's there
-    try:
-        driver.find_element_by_xpath('//button[text()="Approve"]').click()
-    except Exception as e:  # NOQA
-        pass
+    # Try going to metamask if it pops up. With a tab open per chain, the
+    # popup is whichever window appeared, not simply the last one
     try:
-        driver.find_element_by_xpath('//button[text()="Switch network"]').click()
-    except Exception as e:  # NOQA
-        pass
+        WebDriverWait(driver, popup_timeout).until(
+            lambda d: len(d.window_handles) > len(handles_before)
+        )
+    except TimeoutException:
+        return
+    new_handles = [h for h in driver.window_handles if h not in handles_before]
+    driver.switch_to.window(new_handles[-1])
+
+    # Click metamask buttons if they're there
+    for text in ("Approve", "Switch network"):
+        locator = (By.XPATH, f'//button[text()="{text}"]')
+        try:
+            WebDriverWait(driver, popup_timeout).until(
+                EC.element_to_be_clickable(locator)
+            ).click()
+        except Exception as e:  # NOQA
+            pass
 
     # Switch back to main window
     driver.switch_to.window(cur_handle)
 
 
+def open_chain_tab(driver, chain_name: str, load_sleep: float) -> str:
+    """
+    Opens the scrape page in a new tab and switches it to the given chain.
+    The tab is kept open and refreshed on later cycles, so the chain does not
+    have to be re-selected every time. If selecting the chain fails, the new
+    tab is closed before the error is re-raised.
+
+    Args:
+        driver: Web driver
+        chain_name: Chain to select in the new tab
+        load_sleep: Maximum seconds to wait for the page to load before
+            selecting the chain
+
+    Returns:
+        handle: Window handle of the new tab
+    """
+    prev_handle = driver.current_window_handle
+    handles_before = set(driver.window_handles)
+    driver.execute_script("window.open(arguments[0])", URL_SCRAPE)
+    handle = next(h for h in driver.window_handles if h not in handles_before)
+    driver.switch_to.window(handle)
+
+    try:
+        # Switch chains once the page renders its chain button, wait for the
+        # button to show the new chain, then reload so the grid is populated
+        # for that chain
+        click_chain(driver, chain_name, timeout=load_sleep)
+        WebDriverWait(driver, load_sleep).until(
+            EC.presence_of_element_located((By.XPATH, f'//span[text()="{chain_name}"]'))
+        )
+        driver.refresh()
+    except Exception:
+        # Don't leave an orphan tab behind on failure
+        driver.close()
+        driver.switch_to.window(prev_handle)
+        raise
+    return handle
+
+
 def expand_details(driver, wait_sec=0.5):
-    """Expand all the detail buttons"""
-    detail_buttons = driver.find_elements_by_xpath('//span[text()="See details"]')
-    for i, d in enumerate(detail_buttons):
-        try:
-            # Click "slowly" since it can act funny otherwise
-            sleep(wait_sec)
-            d.click()
-        except Exception as e:  # NOQA
-            pass
+    """Expand all the detail buttons in one script call, then let it render"""
+    try:
+        driver.execute_script(EXPAND_DETAILS_JS)
+    except Exception as e:  # NOQA
+        pass
+    sleep(wait_sec)
 
 
 def get_row_text(driver):
-    """Retrieves raw row text"""
-    els = driver.find_elements_by_xpath('//*[contains(@class, "MuiTypography-noWrap")]')
-    els_text = list()
-    for el in els:
-        els_text.append(el.text)
-    return els_text
+    """Retrieves raw row text in a single script call"""
+    return driver.execute_script(ROW_TEXT_JS)
 
 
 def check_page_loaded(els_text):
     """Page isn't loaded if % and $ don't appear in the row text"""
-    return any(["%" in s for s in els_text]) and any(["$" in s for s in els_text])
+    joined = "\n".join(els_text)
+    return "%" in joined and "$" in joined
+
+
+def wait_for_rows(driver, timeout: float, poll_sec: float = 0.5) -> List[str]:
+    """
+    Waits until the pool grid is populated, polling its text every
+    `poll_sec` seconds instead of sleeping a fixed time.
+
+    Args:
+        driver: Web driver
+        timeout: Maximum seconds to wait
+        poll_sec: Seconds between checks
+
+    Returns:
+        els_text: Row text once loaded
+
+    Raises:
+        TimeoutException: If not loaded within `timeout`
+    """
+
+    def rows_if_loaded(d):
+        els_text = get_row_text(d)
+        return els_text if check_page_loaded(els_text) else False
+
+    return WebDriverWait(driver, timeout, poll_frequency=poll_sec).until(rows_if_loaded)
 
 
 def parse_text_field(t: str):
@@ -126,19 +228,19 @@ def parse_text_field(t: str):
         t: text field to convert to structured values
 
     Returns:
-        t: text field, parsed
+        t: text field, parsed. None if empty or NaN
     """
-    t = t.replace("%", "").replace("$", "").replace(",", "")
-    t = t.replace("From ", "")
-    t = t.replace(" up to", "")
-    t = t.strip()
-    if len(t) < 7 and t[-1] == "x":
+    t = t.translate(STRIP_TABLE).replace("From ", "").replace(" up to", "").strip()
+    if not t:
+        return None
+    if len(t) < 7 and t.endswith("x"):
         t = t[:-1]
     try:
         t = float(t)
-    except:  # NOQA
-        pass
-    return t
+    except ValueError:
+        return t
+    # Text such as "NaN" parses to NaN, which is stored as null
+    return None if t != t else t
 
 
 def parse_row(row_fields: List[str]) -> Dict[str, Union[str, float]]:
@@ -164,33 +266,23 @@ def parse_row(row_fields: List[str]) -> Dict[str, Union[str, float]]:
         "leverage_max": parse_text_field(row_fields[6]),
     }
 
-    # Try to find the rest
-    for label, fieldname in FIELD_MAP.items():
-        d[label] = get_field(row_fields, fieldname)
+    # Find the rest in one pass. Only the first occurrence of a label counts
+    d.update(dict.fromkeys(FIELD_MAP))
+    seen = set()
+    for i, t in enumerate(row_fields):
+        fields = LABEL_TO_FIELDS.get(t)
+        if fields is None or t in seen:
+            continue
+        seen.add(t)
+        try:
+            value = parse_text_field(row_fields[i + 1])
+        except:  # NOQA
+            value = None
+        for fieldname in fields:
+            d[fieldname] = value
     return d
 
 
-def get_field(chunk: List[str], s: str) -> Union[str, float, None]:
-    """
-    Search list of strings for a string and returns the following
-    element, parsed.
-
-    Args:
-        chunk: List of strings to parse
-
-    Returns:
-        field: data field, fetched
-    """
-    field = None
-    for i, t in enumerate(chunk):
-        if s == t:
-            try:
-                field = parse_text_field(chunk[i + 1])
-            except:  # NOQA
-                pass
-            return field
-
-
 def parse_rows(all_row_text: List[str]) -> List[Dict[str, Union[str, float]]]:
     """
     Iterates through each row of data and parses into list of data objects
@@ -201,56 +293,33 @@ def parse_rows(all_row_text: List[str]) -> List[Dict[str, Union[str, float]]]:
     Returns:
         data: All rows of data as a list (i.e. all pools)
     """
+    # Single pass, parsing each row once the start of the next one is found
     data = list()
-
-    start_inds = list()
+    i_start = None
     for i, t in enumerate(all_row_text):
         if t in START_KEYS:
-            start_inds.append(i)
-
-    for i in range(len(start_inds)):
-        i_start = start_inds[i]
-        if i < len(start_inds) - 1:
-            i_stop = start_inds[i + 1]
-        else:
-            i_stop = len(all_row_text)
-        t = all_row_text[i_start:i_stop]
-        d = parse_row(t)
-        data.append(d)
+            if i_start is not None:
+                data.append(parse_row(all_row_text[i_start:i]))
+            i_start = i
+    if i_start is not None:
+        data.append(parse_row(all_row_text[i_start:]))
     return data
 
 
-def pool_dict_to_obj(d: Dict[str, Union[str, float, int]]) -> AlphaHomoraPool:
-    """Converts dictionary to object using gets to allow nulls"""
-    # First make sure no weird NaN values by checking x != x
-    # Ref: https://stackoverflow.com/a/944712
-    for k, v in d.items():
-        if v != v:
-            # When nan, set to None
-            d[k] = None
-    
-    # Create record
-    record = AlphaHomoraPool(
-        timestamp=d.get("timestamp"),
-        chain=d.get("chain"),
-        strategy=d.get("strategy"),
-        pool=d.get("pool"),
-        protocol=d.get("protocol"),
-        leverage_min=d.get("leverage_min"),
-        leverage_max=d.get("leverage_max"),
-        leverage_highest_apr=d.get("leverage_highest_apr"),
-        apr_min=d.get("apr_min"),
-        apr_max=d.get("apr_max"),
-        apy_trading_fee=d.get("apy_trading_fee"),
-        apr_farming=d.get("apr_farming"),
-        apr_reward=d.get("apr_reward"),
-        apy_borrow=d.get("apy_borrow"),
-        trading_volume_24h=d.get("trading_volume_24h"),
-        tvl_pool=d.get("tvl_pool"),
-        tvl_homora=d.get("tvl_homora"),
-        positions=d.get("positions"),
-    )
-    return record
+# Rows per INSERT statement and commit
+INSERT_CHUNK_SIZE = 500
+
+# Columns written per pool, i.e. all but the leading autoincrement id
+POOL_COLUMNS = tuple(c.name for c in AlphaHomoraPool.__table__.columns)[1:]
+
+
+def pool_dict_to_row(d: Dict[str, Union[str, float, int]]) -> Dict[str, Any]:
+    """
+    Converts dictionary to an insert row of AlphaHomoraPool columns, with
+    missing fields as None. parse_text_field never emits NaN, so values are
+    passed through as is.
+    """
+    return {k: d.get(k) for k in POOL_COLUMNS}
 
 
 @app.command()
@@ -286,6 +355,7 @@ def scrape(
     config = yaml.load(config_file.read_text(), Loader=yaml.Loader)
     extension_path = str(Path(config["selenium"]["metamask"]["path"]).resolve())
     executable_path = config["selenium"]["executable_path"]
+    browser = config["selenium"].get("browser", "firefox")
     output_file = None
     if config["output"]["enabled"]:
         output_file = config["output"]["filename"]
@@ -315,13 +385,22 @@ def scrape(
         username = db_config["username"]
         database = db_config["database"]
         port = db_config["port"]
-        db = DatabaseAdapter(hostname, username, db_password, database, port)
+        db = DatabaseAdapter(
+            hostname,
+            username,
+            db_password,
+            database,
+            port,
+            pool_size=5,
+            max_overflow=10,
+        )
 
         # Intialize a session
         session = db.create_session()
 
     logging.info("Start the Web Driver and load Metamask extension.")
-    driver = init_driver_firefox(
+    init_driver = init_driver_chrome if browser == "chrome" else init_driver_firefox
+    driver = init_driver(
         executable_path=executable_path, extension_paths=[extension_path]
     )
 
@@ -339,6 +418,12 @@ def scrape(
 
     # Mega loop to do the parsing
     logging.info("Initialization complete!")
+    chain_handles = dict()  # Tab kept open per chain
+
+    # Keep the output file open across cycles, flushing after each one
+    if output_file:
+        output_fh = open(output_file, mode="a", buffering=1 << 20)
+        writer = jsonlines.Writer(output_fh)
     enabled = True
     while enabled:
         if once:
@@ -346,67 +431,55 @@ def scrape(
             enabled = False
         data = list()
 
+        # One timestamp per cycle, so all chains share the same snapshot key
+        timestamp = datetime.utcnow().isoformat()
+
         # Check each chain
         for chain in chains_to_check:
             data_chain = list()
-            timestamp = datetime.utcnow().isoformat()
             logging.info(f"Fetching data for chain={chain} at timestamp={timestamp}")
 
-            # Switch chains
+            # Switch to this chain's tab, opening it on the first cycle. Later
+            # cycles reload it, so the grid is re-fetched rather than re-read
             try:
-                click_chain(driver, chain)
+                if chain in chain_handles:
+                    driver.switch_to.window(chain_handles[chain])
+                    driver.refresh()
+                else:
+                    logging.info(f"\tOpening tab for {chain}.")
+                    chain_handles[chain] = open_chain_tab(driver, chain, load_sleep)
             except Exception as e:  # NOQA
                 logging.error(
-                    f"Unable to click to chain: {chain}. Error: {e}. Skipping."
+                    f"Unable to open tab for chain: {chain}. Error: {e}. Skipping."
                 )
+                # Close a broken tab so it is reopened next cycle, instead of
+                # piling up
+                handle = chain_handles.pop(chain, None)
+                if handle is not None:
+                    try:
+                        driver.switch_to.window(handle)
+                        driver.close()
+                    except Exception:
+                        pass
+                    driver.switch_to.window(base_handle)
                 sleep(chain_sleep)
                 continue
 
-            # Pause a moment and refresh
-            sleep(2)
-
-            # Refresh. It can be slow to generate stuff
+            # Fetch the grid data as soon as it is populated
             try:
-                logging.info(
-                    f"\tLoading page and waiting {load_sleep} seconds since takes "
-                    f"a moment for data to populate."
-                )
-                driver.get(URL_SCRAPE)
-                sleep(load_sleep)
-            except Exception as e:  # NOQA
-                logging.error(
-                    f"Unable to reload url: {URL_SCRAPE}. Error: {e}. Skipping."
-                )
-                sleep(chain_sleep)
-                continue
-
-            # Fetch the grid data
-            wait_cnt = 0
-            try:
-                while wait_cnt < max_waits:
-                    # Click on each tab to expand details
-                    expand_details(driver)
-
-                    # Get text of each pool row
-                    els_text = get_row_text(driver)
-
-                    # Decide if page fully loaded
-                    if check_page_loaded(els_text):
-                        break
-                    else:
-                        logging.info(
-                            f"\tPage not loaded yet. Trying again in "
-                            f"{load_sleep} seconds."
-                        )
-                        wait_cnt += 1
-                        sleep(load_sleep)
-
-                if wait_cnt == max_waits:
+                try:
+                    wait_for_rows(driver, max_waits * load_sleep)
+                except TimeoutException:
                     logging.warning(
                         "\tReached max waits. Giving up and skipping this chain."
                     )
                     continue
 
+                # Click on each tab to expand details, and get text of each
+                # pool row
+                expand_details(driver)
+                els_text = get_row_text(driver)
+
                 # Loop through generating objects
                 logging.info(f"\tFound {len(els_text)} raw text elements. Parsing.")
                 data_chain = parse_rows(els_text)
@@ -434,24 +507,32 @@ def scrape(
         # Optionally save to file
         if output_file:
             logging.info(f"Adding {len(data)} records to {output_file}.")
-            with jsonlines.open(output_file, mode="a") as writer:
-                writer.write_all(data)
+            writer.write_all(data)
+            output_fh.flush()
 
         # Optionally save to DB
         if db:
             logging.info(f"Writing {len(data)} records to database.")
             try:
-                records = list()
-                for d in data:
-                    record = pool_dict_to_obj(d)
-                    records.append(record)
-                session.bulk_save_objects(records)
-                session.commit()
-            except Exception as e:  # NOQA                
+                rows = (pool_dict_to_row(d) for d in data)
+                for chunk in chunked(rows, INSERT_CHUNK_SIZE):
+                    session.execute(INSERT_ALPHA_HOMORA_POOL, chunk)
+                    session.commit()
+            except OperationalError as e:
+                # Connection dropped. Start over with a fresh session
+                logging.error(
+                    f"Lost database connection while writing records. Reconnecting "
+                    f"and moving along. Error: {e}."
+                )
+                session.rollback()
+                session.close()
+                session = db.create_session()
+            except Exception as e:  # NOQA
+                session.rollback()
                 logging.error(
                     f"Something bad happened while trying to write records. "
                     f"Skipping and moving along. Error: {e}."
-                )                
+                )
 
         # Wait until next cycle to check
         logging.info("Scrape complete!")
@@ -461,6 +542,9 @@ def scrape(
 
     # Cleanup
     driver.quit()
+    if output_file:
+        writer.close()
+        output_fh.close()
 
 
 if __name__ == "__main__":
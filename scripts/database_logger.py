@@ -17,17 +17,20 @@ from adapters.apis.alpaca_finance import AlpacaFinanceAdapter
 from adapters.apis.alpha_homora import AlphaHomoraAdapter
 from adapters.apis.coindix import CoinDixAdapter
 from adapters.apis.cream import CreamAdapter
-from adapters.database_adapter import DatabaseAdapter, RawEvent
+from adapters.database_adapter import DatabaseAdapter, RawEvent, dump_event
+import asyncio
 from datetime import datetime
 from interfaces.handlers import DiscordHandler
-import json
+from sqlalchemy.exc import OperationalError
 import logging
-import time
 import typer
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 app = typer.Typer()
 
+# Core INSERT for the write-only poll path, taking rows keyed on column name
+INSERT_RAW_EVENT_ROWS = RawEvent.__table__.insert()
+
 # Define a list of available API interfaces, keyed on a string label
 # and mapped to the requests functiont o call
 API_INTERFACES = {
@@ -52,6 +55,7 @@ def poll(
     discord_webhook_url: str = typer.Option(None),
     discord_username: str = typer.Option("CryptoDataFetcher"),
     once: bool = typer.Option(False),
+    pack: bool = typer.Option(True),
 ) -> None:
     """
     Polls periodically to retrieve data from API and save it to database.
@@ -70,10 +74,77 @@ def poll(
         discord_username: Username to use when sending messages to Discord
             channel
         once: Flag to only run once if set to True. If False, runs forever
+        pack: Flag to pack all records of a data pull into a single event if
+            set to True (the default). If False, logs one event per record
+
+    Returns:
+        None
+    """
+    asyncio.run(
+        _poll(
+            sleep_dur,
+            username,
+            hostname,
+            database,
+            port,
+            password,
+            interfaces,
+            discord_webhook_url,
+            discord_username,
+            once,
+            pack,
+        )
+    )
+
+
+def write_cycle(
+    db: DatabaseAdapter, rows: List[Dict[str, Any]], n_records: int
+) -> None:
+    """
+    Writes one poll cycle's raw event rows in a single transaction, straight
+    through the engine since this path never reads back through the ORM.
+
+    Args:
+        db: Database adapter
+        rows: Raw event rows to insert, keyed on column name
+        n_records: Number of records the rows contain, for logging
 
     Returns:
         None
     """
+    logging.info("Logging results to database ...")
+    try:
+        # Commits on success and rolls back on error
+        with db.engine.begin() as conn:
+            conn.execute(INSERT_RAW_EVENT_ROWS, rows)
+        logging.info(f"Logged {len(rows)} event(s) containing {n_records} records.")
+    except OperationalError as e:
+        # Connection dropped. The pool replaces it on the next checkout
+        logging.error(
+            f"Lost database connection. Reconnecting. Error: {e}", exc_info=True
+        )
+    except Exception as e:
+        logging.error(f"Unable to log to database. Error: {e}", exc_info=True)
+
+
+async def _poll(
+    sleep_dur: int,
+    username: str,
+    hostname: str,
+    database: str,
+    port: int,
+    password: str,
+    interfaces: List[str],
+    discord_webhook_url: Optional[str],
+    discord_username: str,
+    once: bool,
+    pack: bool,
+) -> None:
+    """
+    Async body of poll. The API adapters and database session are blocking,
+    so each fetch and each database write runs in a worker thread while the
+    event loop sleeps and schedules the next cycle. See poll for arguments.
+    """
     # Initialize Discord notifier
     if discord_webhook_url:
         logging.getLogger().addHandler(
@@ -83,10 +154,19 @@ def poll(
         )
 
     # Create database adapter
-    db = DatabaseAdapter(hostname, username, password, database, port)
+    db = DatabaseAdapter(
+        hostname, username, password, database, port, pool_size=5, max_overflow=10
+    )
 
-    # Intialize a session
-    session = db.create_session()
+    # Metadata is constant per interface, so serialize it once
+    metadata_json = {
+        interface: dump_event({"source": interface, "type": "poll"})
+        for interface in interfaces
+    }
+
+    # Previous cycle's database write, left running while the loop sleeps and
+    # fetches the next cycle
+    write_task: Optional[asyncio.Task] = None
 
     first_run = True
     enabled = True
@@ -98,43 +178,76 @@ def poll(
         if first_run:
             first_run = False
         else:
-            time.sleep(sleep_dur)  # at beginning to handle continue calls
+            await asyncio.sleep(sleep_dur)  # at beginning to handle continue calls
+
+        # One timestamp per cycle, so all events of a poll share the same key
+        timestamp = datetime.utcnow()
 
-        # Fetch latest data
+        # Fetch latest data from all interfaces concurrently, since each is
+        # network-bound. Results are serialized in order on the event loop
+        fetches = list()
         for interface in interfaces:
             fn = API_INTERFACES[interface]
             logging.info(f"Fetching {interface} data via function: {fn} ...")
-            try:
-                results = fn()
-                logging.info(f"Fetched {len(results)} records.")
-            except Exception as e:
-                logging.error(f"Unable to fetch data. Error: {e}", exc_info=True)
+            fetches.append(asyncio.to_thread(fn))
+        fetched = await asyncio.gather(*fetches, return_exceptions=True)
+
+        pending_rows = list()
+        n_records = 0
+        for interface, results in zip(interfaces, fetched):
+            if isinstance(results, Exception):
+                logging.error(
+                    f"Unable to fetch {interface} data. Error: {results}",
+                    exc_info=results,
+                )
                 continue
+            logging.info(f"Fetched {len(results)} {interface} records.")
 
-            logging.info("Logging results to database ...")
             source = interface
-            metadata = {"source": source, "type": "poll"}
-            # Create event object
+            # Create event rows
             try:
-                timestamp = datetime.utcnow()
-                # Force pack into a single event so one record per data pull
-                n_record = 1
-                if len(results) > 0:
+                if pack:
+                    # Force pack into a single event so one record per data pull
+                    n_record = 1
+                    if len(results) > 0:
+                        n_record = len(results)
+                        results = [results]
+                    events = [dump_event(results)]
+                else:
+                    # One event per record
                     n_record = len(results)
-                    results = [results]
-                event = RawEvent(
-                    timestamp=timestamp,
-                    event=json.dumps(results),
-                    metadata_=json.dumps(metadata),
-                    source=source,
-                )
-                session.add(event)
-                session.commit()
-                logging.info(f"Logged event containing {n_record} records.")
+                    events = [dump_event(r) for r in results]
+                pending_rows += [
+                    {
+                        "timestamp": timestamp,
+                        "event": event,
+                        "metadata": metadata_json[interface],
+                        "source": source,
+                    }
+                    for event in events
+                ]
+                n_records += n_record
             except Exception as e:
-                logging.error(f"Unable to log to database. Error: {e}", exc_info=True)
+                logging.error(
+                    f"Unable to serialize {interface} data. Error: {e}",
+                    exc_info=True,
+                )
                 continue
 
+        # Write the whole cycle in a single transaction, in the background.
+        # Writes stay ordered since each waits for the previous one
+        if write_task is not None:
+            await write_task
+            write_task = None
+        if not pending_rows:
+            continue
+        write_task = asyncio.create_task(
+            asyncio.to_thread(write_cycle, db, pending_rows, n_records)
+        )
+
+    if write_task is not None:
+        await write_task
+
 
 if __name__ == "__main__":
     logging.basicConfig(
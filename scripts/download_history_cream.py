@@ -3,7 +3,7 @@ Downloads all historical data available on CREAM Finance and
 saves it to a pre-defined file
 """
 from adapters.apis.cream import CreamAdapter
-import json
+from adapters.database_adapter import dump_event
 import logging
 import typer
 from typing import Optional, List
@@ -31,7 +31,7 @@ def download(
     logging.info(f"Fetched {len(results)} records.")
     logging.info(f"Saving results to {output_path} ...")
     with open(output_path, "w") as f:
-        json.dump(results, f)
+        f.write(dump_event(results))
     logging.info("Done!")
 
 
@@ -12,18 +12,25 @@ python3 scripts/import_coindix_history_to_database.py \
     test_table \
     3306
 """
-from adapters.database_adapter import DatabaseAdapter
+from adapters.database_adapter import LOAD_DATA_MIN_ROWS, DatabaseAdapter
+from adapters.database_adapter import chunked, dump_event, iter_json_items
+from collections import defaultdict
 from datetime import datetime
-import json
 import logging
 import pandas as pd
-from sqlalchemy import Column, DateTime, Integer, String
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 import typer
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional
 
 app = typer.Typer()
-Base = declarative_base()
+
+# Raw events inserted and committed per transaction
+COMMIT_CHUNK_SIZE = 10000
+
+
+class Base(DeclarativeBase):
+    """Declarative base class for the dynamically created data model."""
 
 
 def create_datamodel(tablename: str) -> Base:
@@ -33,15 +40,50 @@ def create_datamodel(tablename: str) -> Base:
         """SQLAlchemy object to represent a raw event."""
 
         __tablename__ = tablename
-        id = Column(Integer, primary_key=True, autoincrement=True)
-        timestamp = Column(DateTime)
-        event = Column(String)
-        metadata_ = Column("metadata", String)
-        source = Column(String)
+        id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+        timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime)
+        event: Mapped[Optional[str]] = mapped_column(String)
+        metadata_: Mapped[Optional[str]] = mapped_column("metadata", String)
+        source: Mapped[Optional[str]] = mapped_column(String)
 
     return DataRecord
 
 
+def iter_events(
+    records_by_date: Dict[str, List[Dict[str, Any]]],
+    metadata_str: str,
+    source: str,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily builds one raw event row per date, holding that date's records
+
+    Args:
+        records_by_date: Map of date string to that date's records
+        metadata_str: JSON-encoded metadata for every event
+        source: Source name for every event
+
+    Returns:
+        events: Iterator over raw event rows
+    """
+    dates = sorted(records_by_date)
+    # Parse every date in one vectorized call rather than once per event
+    timestamps = (
+        pd.to_datetime(dates, utc=True, format="ISO8601")
+        .tz_localize(None)
+        .to_pydatetime()
+    )
+    for ts, dt in zip(timestamps, dates):
+        # Create event
+        group_events = records_by_date[dt]
+        event = {
+            "timestamp": ts,
+            "event": dump_event([group_events]),
+            "metadata_": metadata_str,
+            "source": source,
+        }
+        yield event
+
+
 @app.command()
 def insert(
     input_path: str,
@@ -52,6 +94,7 @@ def insert(
     table: str,
     port: int,
     password: str = typer.Option(None, prompt=True, hide_input=True),
+    load_data: bool = typer.Option(False),
 ) -> None:
     """
     Loads data from a file, and stores in a database
@@ -65,6 +108,8 @@ def insert(
         table: raw table to write to
         port: DB port
         password: Password to connect to DB
+        load_data: Use LOAD DATA LOCAL INFILE for large imports. The server
+            must have local_infile enabled
 
     Returns:
         None
@@ -73,53 +118,50 @@ def insert(
     DataRecord = create_datamodel(table)
 
     logging.info(f"Loading records from file: {input_path} ...")
-    with open(input_path, "r") as f:
-        raw_data = json.load(f)
-    logging.info(f"Loaded {len(raw_data)} raw records.")
-
-    # Unnest timeseries
-    results = list()
-    for r in raw_data:
+    # Unnest timeseries while streaming, so the raw records are never all held,
+    # grouping by date into lists of records
+    records_by_date: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    n_raw = 0
+    for r in iter_json_items(input_path):
+        n_raw += 1
         rr = r.copy()
         rr.pop("series")
         for s in r.get("series"):
             record = {**rr, **s}
-            results.append(record)
+            # Remove date since not in real-time pull
+            dt = record.pop("date")
+            records_by_date[dt].append(record)
+    logging.info(f"Loaded {n_raw} raw records.")
 
     # Create database adapter
-    db = DatabaseAdapter(hostname, username, password, database, port)
+    db = DatabaseAdapter(
+        hostname, username, password, database, port, local_infile=load_data
+    )
 
-    # Intialize a session
-    session = db.create_session()
     metadata = {"label": label, "type": "history"}
+    # Encode the constant metadata once rather than per event
+    metadata_str = dump_event(metadata)
     source = "coindix"
 
-    # Save off raw events, grouping-by-date into list of lists
-    df = pd.DataFrame(results)
-    inds_by_date = df.groupby("date").indices
-    logging.info("Creating raw event objects ...")
-    events: List[DataRecord] = list()
-    for dt, inds in inds_by_date.items():
-        # Create a raw event
-        group_events = [results[i] for i in inds]
-        # Remove date since not in real-time pull
-        for g in group_events:
-            g.pop("date")
-        # Create event
-        event = DataRecord(
-            timestamp=datetime.fromisoformat(dt.split("Z")[0]),
-            event=json.dumps([group_events]),
-            metadata_=json.dumps(metadata),
-            source=source,
-        )
-        events.append(event)
-
-    # Save raw events
-    logging.info(f"Bulk saving {len(events)} event records ...")
-    session.bulk_save_objects(events)
-    logging.info(f"Committing {len(events)} raw event records to database ...")
-    session.commit()
-    logging.info(f"Committed {len(events)} records.")
+    # Save off raw events, one per date
+    n_events = len(records_by_date)
+    events = iter_events(records_by_date, metadata_str, source)
+
+    # Save raw events as one Core executemany INSERT, skipping the ORM flush,
+    # or stream them through LOAD DATA when there are enough to pay off
+    if load_data and n_events > LOAD_DATA_MIN_ROWS:
+        logging.info(f"Loading {n_events} raw event records to database ...")
+        db.load_data_infile(DataRecord, events)
+        logging.info(f"Committed {n_events} records.")
+    else:
+        # Commit in bounded chunks, so only one chunk of rows is held at a
+        # time and each transaction stays small
+        logging.info(f"Inserting {n_events} raw event records to database ...")
+        n_committed = 0
+        for batch in chunked(events, COMMIT_CHUNK_SIZE):
+            db.bulk_insert(DataRecord, batch)
+            n_committed += len(batch)
+            logging.info(f"Committed {n_committed}/{n_events} records.")
 
 
 if __name__ == "__main__":
@@ -1,6 +1,6 @@
 """
 This script takes the raw JSON output of adapters/apis/coindix.py and converts to
-a flat CSV.
+a flat CSV (or Parquet, for a .parquet output path).
 
 Example Usage:
 $ python3 process_coindix_file.py \
@@ -9,13 +9,16 @@ $ python3 process_coindix_file.py \
 
 """
 
+from interfaces.files import write_output
 import pandas as pd
-from tqdm import tqdm
 import typer
 from typing import Optional
 
 app = typer.Typer()
 
+# Series columns stored as float32. Others (e.g. tvl) stay float64
+FLOAT32_COLUMNS = ["base", "reward", "apy"]
+
 
 @app.command()
 def convert_coindix_file(
@@ -26,31 +29,27 @@ def convert_coindix_file(
     df = pd.read_json(input_path)
     print(f"Loaded {len(df)} vaults.")
 
-    # Loop through each vault, extract the time series, and append to list
+    # Explode each vault's time series into one row per point, in one pass
     print("Extracting time-series for each vault ...")
-    results = list()
-    for i, row in tqdm(df.iterrows()):
-        dft = pd.DataFrame(row["series"])
-        # Transform the columns
-        for c in dft.columns:
-            if c == "date":
-                dft[c] = pd.to_datetime(dft[c], utc=True)
-            else:
-                dft[c] = dft[c].astype(
-                    float
-                )  # Cast to float. Comes in mapped such that 0.1 is 10%
-
-        # Add common fields
-        dft["name"] = row["name"]
-        dft["protocol"] = row["protocol"]
-        dft["chain"] = row["chain"]
-
-        # Append to end
-        results.append(dft)
+    exploded = df[["name", "protocol", "chain", "series"]].explode(
+        "series", ignore_index=True
+    )
+    exploded = exploded.dropna(subset=["series"]).reset_index(drop=True)
+    dft = pd.json_normalize(exploded["series"].tolist())
+    # Transform the columns
+    dft["date"] = pd.to_datetime(dft["date"], utc=True)
+    num_cols = dft.columns.drop("date")
+    # Cast to float. Comes in mapped such that 0.1 is 10%. The rate columns
+    # are downcast to float32, which keeps ~7 significant digits, plenty for
+    # rates. TVL stays float64, since dollar amounts in the hundreds of
+    # millions would be rounded in float32
+    dft[num_cols] = dft[num_cols].astype(float)
+    rate_cols = [c for c in FLOAT32_COLUMNS if c in dft.columns]
+    dft[rate_cols] = dft[rate_cols].astype("float32")
     print("Done!")
 
-    print("Concatenating results and restructuring output ...")
-    df_out = pd.concat(results)
+    print("Restructuring output ...")
+    df_out = pd.concat([exploded[["name", "protocol", "chain"]], dft], axis=1)
     df_out = df_out[
         ["date", "chain", "protocol", "name", "base", "reward", "apy", "tvl"]
     ]
@@ -60,8 +59,8 @@ def convert_coindix_file(
     print(df_out.iloc[100:105, :])
 
     if output_path:
-        print(f"Writing to CSV file: {output_path}")
-        df_out.to_csv(output_path, index=None)
+        print(f"Writing to file: {output_path}")
+        write_output(df_out, output_path)
 
     return df_out
 
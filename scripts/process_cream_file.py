@@ -1,6 +1,6 @@
 """
 This script takes the raw JSON output of adapters/apis/coindix.py and converts to
-a flat CSV.
+a flat CSV (or Parquet, for a .parquet output path).
 
 Example Usage:
 $ python3 process_coindix_file.py \
@@ -9,7 +9,9 @@ $ python3 process_coindix_file.py \
 
 """
 
-import json
+from adapters.database_adapter import load_json
+from interfaces.files import write_output
+import numpy as np
 import pandas as pd
 import typer
 from typing import Optional
@@ -23,8 +25,7 @@ def convert_cream_file(
 ) -> pd.DataFrame:
 
     print(f"Loading file: {input_path} ...")
-    with open(input_path, "r") as f:
-        data = json.load(f)
+    data = load_json(input_path)
 
     # Extract records and convert to dataframe
     print("Extracting records ...")
@@ -33,18 +34,15 @@ def convert_cream_file(
 
     # Reformat
     print("Reformatting records ...")
-    df["borrow_apy"] = (
-        df["borrow_apy"].astype(float) / 100.0
-    )  # Cast to float and map to unit 1.0
-    df["supply_apy"] = (
-        df["supply_apy"].astype(float) / 100.0
-    )  # Cast to float and map to unit 1.0
+    # Cast to float32, plenty for APYs, and map to unit 1.0
+    apy_cols = ["borrow_apy", "supply_apy"]
+    df[apy_cols] = df[apy_cols].astype("float32") / np.float32(100.0)
     df["date"] = pd.to_datetime(df["date"], utc=True)
     print(f"Finished processing {len(df)} records.")
 
     if output_path:
-        print(f"Saving to CSV: {output_path}")
-        df.to_csv(output_path, index=None)
+        print(f"Saving to file: {output_path}")
+        write_output(df, output_path)
 
     return df
 
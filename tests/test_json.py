@@ -0,0 +1,34 @@
+"""
+Tests for the JSON helpers shared by the API and database adapters.
+"""
+from adapters.apis.util import json_dumps, json_loads
+from adapters.database_adapter import dump_event, load_json
+
+BIG_INT = 2**70
+
+
+def test_json_loads_keeps_big_ints_exact():
+    payload = f'{{"amount": {BIG_INT}, "rate": 0.5}}'
+    for s in (payload, payload.encode()):
+        data = json_loads(s)
+        assert data["amount"] == BIG_INT
+        assert isinstance(data["amount"], int)
+        assert data["rate"] == 0.5
+
+
+def test_json_dumps_round_trips_big_ints():
+    assert json_loads(json_dumps({"amount": BIG_INT})) == {"amount": BIG_INT}
+
+
+def test_load_json_keeps_big_ints_exact(tmp_path):
+    path = tmp_path / "history.json"
+    path.write_text(f'[[{{"amount": {BIG_INT}}}]]')
+    assert load_json(str(path)) == [[{"amount": BIG_INT}]]
+
+
+def test_dump_event_falls_back_for_big_ints():
+    assert dump_event({"amount": BIG_INT}) == f'{{"amount":{BIG_INT}}}'
+
+
+def test_dump_event_writes_nan_as_null():
+    assert dump_event({"rate": float("nan")}) == '{"rate":null}'